@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import logging
 import re
 import sys
@@ -8,6 +9,7 @@ import aio_pika
 import aiohttp
 import aioredis
 import asyncpg
+import discord
 import orjson
 
 from discord.ext import commands
@@ -16,7 +18,7 @@ from discord.gateway import DiscordClientWebSocketResponse, DiscordWebSocket
 from discord.utils import parse_time
 from groq import AsyncGroq
 
-from classes.http import HTTPClient
+from classes.http import HTTPClient, current_route
 from classes.misc import Session, Status
 from classes.state import State
 from utils import tools
@@ -25,6 +27,15 @@ from utils.prometheus import Prometheus
 
 log = logging.getLogger(__name__)
 
+_api_url = re.compile(r"https:\/\/[a-z\.]+\/api\/v[0-9]+")
+_url_id = re.compile(r"\/[%A-Z0-9]+")
+_url_query = re.compile(r"\?.+")
+
+
+@functools.lru_cache(maxsize=1024)
+def _url_route(url):
+    return _url_query.sub("", _url_id.sub("/_id", _api_url.sub("", url)))
+
 
 class ModMail(commands.AutoShardedBot):
     def __init__(self, command_prefix=None, **kwargs):
@@ -61,6 +72,8 @@ class ModMail(commands.AutoShardedBot):
         self._amqp_channel = None
         self._amqp_queue = None
 
+        self._event_locks = {}
+
         self.config = Config()
         self.session = aiohttp.ClientSession(loop=self.loop)
         self.http_uri = f"http://{self.config.BOT_API_HOST}:{self.config.BOT_API_PORT}"
@@ -73,6 +86,17 @@ class ModMail(commands.AutoShardedBot):
         self.ai = None
 
         self._enabled_events = [
+            "CHANNEL_CREATE",
+            "CHANNEL_DELETE",
+            "CHANNEL_UPDATE",
+            "GUILD_DELETE",
+            "GUILD_MEMBER_ADD",
+            "GUILD_MEMBER_REMOVE",
+            "GUILD_MEMBER_UPDATE",
+            "GUILD_ROLE_CREATE",
+            "GUILD_ROLE_DELETE",
+            "GUILD_ROLE_UPDATE",
+            "GUILD_UPDATE",
             "MESSAGE_CREATE",
             "MESSAGE_REACTION_ADD",
             "READY",
@@ -133,8 +157,11 @@ class ModMail(commands.AutoShardedBot):
             int(x): Session(y) for x, y in (await self._connection.get("gateway_sessions")).items()
         }
 
-    async def get_channel(self, channel_id):
-        return await self._connection.get_channel(channel_id)
+    async def get_channel(self, channel_id, guild_id=None):
+        return await self._connection.get_channel(channel_id, guild_id)
+
+    async def get_channels(self, channel_ids):
+        return await self._connection.get_channels(channel_ids)
 
     async def get_guild(self, guild_id):
         return await self._connection._get_guild(guild_id)
@@ -142,6 +169,19 @@ class ModMail(commands.AutoShardedBot):
     async def get_user(self, user_id):
         return await self._connection.get_user(user_id)
 
+    async def fetch_user(self, user_id):
+        data = (await self._connection._get_users([user_id])).get(int(user_id))
+
+        if data is None:
+            data = await self.http.get_user(user_id)
+            await self._connection._store_user(data)
+
+        return self._connection.store_user(data)
+
+    async def fetch_users(self, user_ids):
+        users = await self._connection._get_users(user_ids)
+        return [self._connection.store_user(x) for x in users.values()]
+
     async def get_emoji(self, emoji_id):
         return await self._connection.get_emoji(emoji_id)
 
@@ -151,9 +191,9 @@ class ModMail(commands.AutoShardedBot):
     async def get_all_members(self):
         pass
 
-    async def receive_message(self, msg):
+    async def receive_message(self, msg, payload=None):
         self.ws._dispatch("socket_raw_receive", msg)
-        msg = orjson.loads(msg)
+        msg = payload if payload is not None else orjson.loads(msg)
         self.ws._dispatch("socket_response", msg)
 
         op = msg.get("op")
@@ -173,6 +213,9 @@ class ModMail(commands.AutoShardedBot):
         if event not in self._enabled_events:
             return
 
+        if event == "MESSAGE_CREATE" and not await self._is_relevant_message(data):
+            return
+
         try:
             await func(data, old)
         except asyncio.CancelledError:
@@ -183,6 +226,55 @@ class ModMail(commands.AutoShardedBot):
             except asyncio.CancelledError:
                 pass
 
+    def _event_key(self, payload):
+        data = payload.get("d")
+        if not isinstance(data, dict):
+            return None
+
+        return data.get("channel_id") or data.get("guild_id")
+
+    async def _process_message(self, message, semaphore):
+        try:
+            async with message.process(ignore_processed=True):
+                payload = orjson.loads(message.body)
+                key = self._event_key(payload)
+
+                if key is None:
+                    await self.receive_message(message.body, payload)
+                else:
+                    lock, count = self._event_locks.get(key, (asyncio.Lock(), 0))
+                    self._event_locks[key] = (lock, count + 1)
+
+                    try:
+                        async with lock:
+                            await self.receive_message(message.body, payload)
+                    finally:
+                        lock, count = self._event_locks.pop(key)
+                        if count > 1:
+                            self._event_locks[key] = (lock, count - 1)
+
+                await message.ack()
+        finally:
+            semaphore.release()
+
+    async def _is_relevant_message(self, data):
+        if data.get("author", {}).get("bot"):
+            return False
+
+        if not data.get("guild_id"):
+            return True
+
+        content = data.get("content", "")
+        if content.startswith((f"<@{self.id}> ", f"<@!{self.id}> ")):
+            return True
+
+        channel = await self._connection._get_cached(f"channel:{data['channel_id']}")
+        if channel and tools.is_modmail_topic(channel.get("topic")):
+            return True
+
+        guild = discord.Object(int(data["guild_id"]))
+        return content.startswith(await tools.get_guild_prefix(self, guild))
+
     async def send_message(self, msg):
         data = orjson.dumps(msg)
         self.ws._dispatch("socket_raw_send", data)
@@ -199,10 +291,11 @@ class ModMail(commands.AutoShardedBot):
         if elapsed > 1:
             log.warning(f"{params.method} {params.url} took {round(elapsed, 2)} seconds")
 
-        route = str(params.url)
-        route = re.sub(r"https:\/\/[a-z\.]+\/api\/v[0-9]+", "", route)
-        route = re.sub(r"\/[%A-Z0-9]+", "/_id", route)
-        route = re.sub(r"\?.+", "", route)
+        route = current_route.get()
+        if route is not None:
+            route = route.path.partition("?")[0]
+        else:
+            route = _url_route(str(params.url))
 
         if not route.startswith("/"):
             return
@@ -214,6 +307,39 @@ class ModMail(commands.AutoShardedBot):
                 "status": str(params.response.status),
             }
         )
+        self.prom.http_latency.observe(
+            {
+                "method": params.method,
+                "route": route,
+                "bucket": params.response.headers.get("X-RateLimit-Bucket", "none"),
+            },
+            elapsed,
+        )
+
+    async def _listen_invalidations(self):
+        while True:
+            redis = None
+
+            try:
+                redis = await aioredis.create_redis(
+                    (self.config.REDIS_HOST, int(self.config.REDIS_PORT)),
+                    password=self.config.REDIS_PASSWORD,
+                    loop=self.loop,
+                )
+                channel = (await redis.subscribe("cache_invalidation"))[0]
+
+                for name in ["data", "prefix", "snippet"]:
+                    self._connection.caches[name].clear()
+
+                async for message in channel.iter():
+                    self._connection._handle_invalidation(orjson.loads(message))
+            except (OSError, aioredis.RedisError):
+                log.warning("Lost the cache invalidation subscription, reconnecting.")
+            finally:
+                if redis is not None:
+                    redis.close()
+
+            await asyncio.sleep(5)
 
     async def ai_generate(self, text):
         completion = await self.ai.chat.completions.create(
@@ -259,6 +385,7 @@ class ModMail(commands.AutoShardedBot):
                 port=int(self.config.RABBIT_PORT),
             )
             self._amqp_channel = await self._amqp.channel()
+            await self._amqp_channel.set_qos(prefetch_count=int(self.config.BOT_CONCURRENCY or 10))
             self._amqp_queue = await self._amqp_channel.get_queue("gateway.recv")
 
         self.prom = Prometheus(self)
@@ -289,6 +416,8 @@ class ModMail(commands.AutoShardedBot):
         if not worker:
             return
 
+        self.loop.create_task(self._listen_invalidations())
+
         for extension in self._cogs:
             try:
                 self.load_extension("cogs." + extension)
@@ -296,8 +425,9 @@ class ModMail(commands.AutoShardedBot):
                 log.error(f"Failed to load extension {extension}.", file=sys.stderr)
                 log.error(traceback.print_exc())
 
+        semaphore = asyncio.Semaphore(int(self.config.BOT_CONCURRENCY or 10))
+
         async with self._amqp_queue.iterator() as queue_iter:
             async for message in queue_iter:
-                async with message.process(ignore_processed=True):
-                    await self.receive_message(message.body)
-                    await message.ack()
+                await semaphore.acquire()
+                self.loop.create_task(self._process_message(message, semaphore))
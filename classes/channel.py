@@ -34,45 +34,59 @@ class TextChannel(channel.TextChannel):
         data = await self._state.http.create_invite(self.id, reason=reason, **fields)
         return await Invite.from_incomplete(data=data, state=self._state)
 
+    def _overwrite_map(self):
+        result = self._state.caches["overwrites"].get(self.id)
+        if result is not None:
+            return result
+
+        everyone = None
+        roles = {}
+        members = {}
+
+        for overwrite in self._overwrites:
+            if overwrite.id == self.guild.id:
+                everyone = (overwrite.allow, overwrite.deny)
+            elif overwrite.is_role():
+                roles[overwrite.id] = (overwrite.allow, overwrite.deny)
+            elif overwrite.is_member():
+                members.setdefault(overwrite.id, (overwrite.allow, overwrite.deny))
+
+        result = (everyone, roles, members)
+        self._state.caches["overwrites"].set(self.id, result)
+
+        return result
+
     async def _permissions_for(self, member):
         if self.guild.owner_id == member.id:
             return Permissions.all()
 
-        default = await self.guild.default_role()
-        base = Permissions(default.permissions.value)
-        roles = await self.guild.roles()
+        roles = await self.guild._role_permissions()
 
-        for role in roles:
-            if role.id in member._roles:
-                base.value |= role._permissions
+        base = Permissions(roles.get(self.guild.id, 0))
+        for role in member._roles:
+            base.value |= roles.get(role, 0)
 
         if base.administrator:
             return Permissions.all()
 
-        try:
-            maybe_everyone = self._overwrites[0]
-            if maybe_everyone.id == self.guild.id:
-                base.handle_overwrite(allow=maybe_everyone.allow, deny=maybe_everyone.deny)
-                remaining_overwrites = self._overwrites[1:]
-            else:
-                remaining_overwrites = self._overwrites
-        except IndexError:
-            remaining_overwrites = self._overwrites
+        everyone, role_overwrites, member_overwrites = self._overwrite_map()
+
+        if everyone:
+            base.handle_overwrite(allow=everyone[0], deny=everyone[1])
 
         denies = 0
         allows = 0
 
-        for overwrite in remaining_overwrites:
-            if overwrite.is_role() and overwrite.id in [x.id for x in roles]:
-                denies |= overwrite.deny
-                allows |= overwrite.allow
+        for role, (allow, deny) in role_overwrites.items():
+            if role in roles:
+                denies |= deny
+                allows |= allow
 
         base.handle_overwrite(allow=allows, deny=denies)
 
-        for overwrite in remaining_overwrites:
-            if overwrite.is_member() and overwrite.id == member.id:
-                base.handle_overwrite(allow=overwrite.allow, deny=overwrite.deny)
-                break
+        if member.id in member_overwrites:
+            allow, deny = member_overwrites[member.id]
+            base.handle_overwrite(allow=allow, deny=deny)
 
         if not base.read_messages:
             denied = Permissions.all_channel()
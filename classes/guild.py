@@ -11,6 +11,7 @@ from discord.enums import (
     VoiceRegion,
     try_enum,
 )
+from discord.errors import NotFound
 from discord.member import VoiceState
 from discord.role import Role
 
@@ -107,6 +108,29 @@ class Guild(guild.Guild):
         data = await self._state.http.get_member(self.id, member_id)
         return Member(data=data, state=self._state, guild=self)
 
+    async def find_member(self, member_id):
+        member = await self.get_member(member_id)
+        if member:
+            return member
+
+        data = await self._state.get(f"member_cache:{self.id}:{member_id}")
+
+        if data is None:
+            try:
+                data = await self._state.http.get_member(self.id, member_id)
+                await self._state._store_user(data["user"])
+            except NotFound:
+                data = ""
+
+            await self._state.set(
+                f"member_cache:{self.id}:{member_id}", data, expire=300 if data else 30
+            )
+
+        if not data:
+            return None
+
+        return Member(data=data, state=self._state, guild=self)
+
     async def _channels(self):
         channels = []
         for channel in await self._state._members_get_all("guild", key_id=self.id, name="channel"):
@@ -135,6 +159,18 @@ class Guild(guild.Guild):
             ]
         )
 
+    async def _role_permissions(self):
+        roles = self._state.caches["roles"].get(self.id)
+
+        if roles is None:
+            roles = {
+                int(x["id"]): int(x["permissions"])
+                for x in await self._state._members_get_all("guild", key_id=self.id, name="role")
+            }
+            self._state.caches["roles"].set(self.id, roles)
+
+        return roles
+
     async def _voice_states(self):
         voices = []
         for voice in await self._state._members_get_all("guild", key_id=self.id, name="voice"):
@@ -165,7 +201,7 @@ class Guild(guild.Guild):
         return channels
 
     async def get_channel(self, channel_id):
-        channel = await self._state.get(f"channel:{channel_id}")
+        channel = await self._state._get_cached(f"channel:{channel_id}")
 
         if not channel:
             return None
@@ -203,19 +239,35 @@ class Guild(guild.Guild):
 
         return None
 
+    async def _me(self):
+        data = await self._state.get(f"member:{self.id}:{self._state.id}")
+        if data:
+            return data
+
+        data = await self._state.get(f"bot_member:{self.id}")
+        if data:
+            return data
+
+        data = await self._state.http.get_member(self.id, self._state.id)
+        await self._state.set(f"bot_member:{self.id}", data)
+        await self._state.expire(f"bot_member:{self.id}", 86400)
+
+        return data
+
     async def me(self):
-        member = await self.get_member(self._state.id)
+        data = self._state.caches["me"].get(self.id)
 
-        if member:
-            return member
+        if data is None:
+            data = await self._me()
+            self._state.caches["me"].set(self.id, data)
 
-        return await self.fetch_member(self._state.id)
+        return Member(guild=self, state=self._state, data=data)
 
     async def roles(self):
         return await self._roles()
 
     async def get_role(self, role_id):
-        role = await self._state.get(f"role:{self.id}:{role_id}")
+        role = await self._state._get_cached(f"role:{self.id}:{role_id}")
 
         if role:
             return Role(guild=self, state=self._state, data=role)
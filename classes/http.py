@@ -1,3 +1,4 @@
+import contextvars
 import logging
 
 from discord import http
@@ -5,8 +6,18 @@ from discord.http import Route
 
 log = logging.getLogger(__name__)
 
+current_route = contextvars.ContextVar("current_route", default=None)
+
 
 class HTTPClient(http.HTTPClient):
+    async def request(self, route, **kwargs):
+        token = current_route.set(route)
+
+        try:
+            return await super().request(route, **kwargs)
+        finally:
+            current_route.reset(token)
+
     def request_guild_members(self, guild_id, query, limit=1):
         return self.request(
             Route(
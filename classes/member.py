@@ -22,9 +22,11 @@ class Member(member.Member):
         if self.guild.owner_id == self.id:
             return Permissions.all()
 
-        base = Permissions.none()
-        for role in await self.roles():
-            base.value |= role._permissions
+        roles = await self.guild._role_permissions()
+
+        base = Permissions(roles.get(self.guild.id, 0))
+        for role in self._roles:
+            base.value |= roles.get(role, 0)
 
         if base.administrator:
             return Permissions.all()
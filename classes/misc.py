@@ -37,3 +37,64 @@ class Status:
     @property
     def last_ack(self):
         return parse_time(self._data["last_ack"].split(".")[0])
+
+
+class GuildData:
+    def __init__(self, data):
+        self._data = data
+
+    @property
+    def guild(self):
+        return self._data["guild"]
+
+    @property
+    def prefix(self):
+        return self._data["prefix"]
+
+    @property
+    def category(self):
+        return self._data["category"]
+
+    @property
+    def access_roles(self):
+        return self._data["accessrole"]
+
+    @property
+    def logging(self):
+        return self._data["logging"]
+
+    @property
+    def welcome(self):
+        return self._data["welcome"]
+
+    @property
+    def goodbye(self):
+        return self._data["goodbye"]
+
+    @property
+    def logging_plus(self):
+        return self._data["loggingplus"]
+
+    @property
+    def ping_roles(self):
+        return self._data["pingrole"]
+
+    @property
+    def blacklist(self):
+        return self._data["blacklist"]
+
+    @property
+    def anonymous(self):
+        return self._data["anonymous"]
+
+    @property
+    def command_only(self):
+        return self._data["commandonly"]
+
+    @property
+    def toggle(self):
+        return self._data["toggle"]
+
+    @property
+    def ai_prompt(self):
+        return self._data["aiprompt"]
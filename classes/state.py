@@ -24,10 +24,12 @@ from discord.reaction import Reaction
 from discord.role import Role
 from discord.user import ClientUser, User
 
+from classes.cache import Cache
 from classes.channel import DMChannel, TextChannel, _channel_factory
 from classes.guild import Guild
 from classes.member import Member
 from classes.message import Message
+from utils import tools
 
 log = logging.getLogger(__name__)
 
@@ -54,6 +56,19 @@ class State:
 
         self.allowed_mentions = options.get("allowed_mentions")
 
+        self.caches = {
+            "object": Cache(
+                maxsize=options.get("cache_size", 10000), ttl=options.get("cache_ttl", 60)
+            ),
+            "data": Cache(maxsize=options.get("cache_size", 10000), ttl=30),
+            "prefix": Cache(maxsize=options.get("cache_size", 10000), ttl=60),
+            "snippet": Cache(maxsize=options.get("cache_size", 10000), ttl=300),
+            "roles": Cache(maxsize=options.get("cache_size", 10000), ttl=60),
+            "overwrites": Cache(maxsize=options.get("cache_size", 10000), ttl=60),
+            "me": Cache(maxsize=options.get("cache_size", 10000), ttl=300),
+            "user": Cache(maxsize=options.get("cache_size", 10000), ttl=300),
+        }
+
         self.parsers = {}
         for attr, func in inspect.getmembers(self):
             if attr.startswith("parse_"):
@@ -72,7 +87,7 @@ class State:
             return value.decode("utf-8")
 
     def _dumps(self, value):
-        if isinstance(value, (str, int, float)):
+        if isinstance(value, (str, bytes, int, float)):
             return value
         return orjson.dumps(value).decode("utf-8")
 
@@ -99,14 +114,66 @@ class State:
 
         return results[0]
 
+    async def _get_cached(self, key):
+        result = self.caches["object"].get(key)
+
+        if result is None:
+            result = await self.get(key)
+
+            if result is not None:
+                self.caches["object"].set(key, result)
+
+        return result
+
+    async def _get_cached_many(self, keys):
+        results = {}
+        missing = []
+
+        for key in keys:
+            result = self.caches["object"].get(key)
+            if result is None:
+                missing.append(key)
+            else:
+                results[key] = result
+
+        if len(missing) >= 1:
+            for key, result in zip(missing, await self.redis.mget(*missing)):
+                result = self._loads(result, True)
+
+                if isinstance(result, dict):
+                    result["_key"] = key
+                    self.caches["object"].set(key, result)
+
+                results[key] = result
+
+        return results
+
+    def _invalidate(self, *keys):
+        self.caches["object"].delete(*keys)
+
+    def _handle_invalidation(self, message):
+        if message.get("type") not in ["data", "prefix", "snippet"]:
+            log.warning(f"Unknown invalidation message {message}.")
+            return
+
+        self.caches[message["type"]].delete(message["guild"])
+
+    async def publish(self, channel, value):
+        return await self.redis.publish(channel, self._dumps(value))
+
     async def expire(self, key, time):
         return await self.redis.expire(key, time)
 
-    async def set(self, key, value=None):
+    async def set(self, key, value=None, expire=0, nx=False):
         if isinstance(key, (list, tuple)):
             return await self.redis.mset(*key)
 
-        return await self.redis.set(key, self._dumps(value))
+        return await self.redis.set(
+            key,
+            self._dumps(value),
+            expire=expire,
+            exist=self.redis.SET_IF_NOT_EXIST if nx else None,
+        )
 
     async def sadd(self, key, *value):
         return await self.redis.sadd(key, *[self._dumps(x) for x in value])
@@ -123,6 +190,52 @@ class State:
     async def scard(self, key):
         return await self.redis.scard(key)
 
+    async def sscan(self, key, match=None, count=None):
+        return [x.decode("utf-8") async for x in self.redis.isscan(key, match=match, count=count)]
+
+    async def hset(self, key, value):
+        return await self.redis.hmset_dict(key, {x: self._dumps(y) for x, y in value.items()})
+
+    async def hget(self, key, field, decode=True):
+        return self._loads(await self.redis.hget(key, field), decode)
+
+    async def hgetall(self, key):
+        return {x.decode("utf-8"): y for x, y in (await self.redis.hgetall(key)).items()}
+
+    async def zadd(self, key, score, value):
+        return await self.redis.zadd(key, score, self._dumps(value))
+
+    async def zrem(self, key, *value):
+        return await self.redis.zrem(key, *[self._dumps(x) for x in value])
+
+    async def zrangebyscore(self, key, minimum=float("-inf"), maximum=float("inf")):
+        return [x.decode("utf-8") for x in await self.redis.zrangebyscore(key, minimum, maximum)]
+
+    async def rpush(self, key, *value):
+        return await self.redis.rpush(key, *[self._dumps(x) for x in value])
+
+    async def rpushx(self, key, value, maxlen=None, expire=0):
+        if maxlen is None and not expire:
+            return await self.redis.rpushx(key, self._dumps(value))
+
+        transaction = self.redis.multi_exec()
+        length = transaction.rpushx(key, self._dumps(value))
+
+        if maxlen is not None:
+            transaction.ltrim(key, -maxlen, -1)
+
+        if expire:
+            transaction.expire(key, expire)
+
+        await transaction.execute()
+        return await length
+
+    async def lrange(self, key, start=0, stop=-1, decode=True):
+        return [self._loads(x, decode) for x in await self.redis.lrange(key, start, stop)]
+
+    async def ltrim(self, key, start, stop):
+        return await self.redis.ltrim(key, start, stop)
+
     async def _members(self, key, key_id=None):
         key += "_keys"
 
@@ -247,11 +360,58 @@ class State:
     def store_user(self, data):
         return User(state=self, data=data)
 
+    async def _store_user(self, data):
+        if self.caches["user"].get(int(data["id"])) == data:
+            return
+
+        self.caches["user"].set(int(data["id"]), data)
+        await self.set(f"user_cache:{data['id']}", data, expire=86400)
+
+    async def _get_users(self, user_ids):
+        users = {}
+        missing = []
+
+        for user_id in set(int(x) for x in user_ids):
+            data = self.caches["user"].get(user_id)
+            if data is None:
+                missing.append(user_id)
+            else:
+                users[user_id] = data
+
+        if missing:
+            results = await self.redis.mget(*[f"user_cache:{x}" for x in missing])
+            for user_id, result in zip(missing, results):
+                if result is not None:
+                    users[user_id] = orjson.loads(result)
+                    self.caches["user"].set(user_id, users[user_id])
+
+        return users
+
+    async def _user_member_keys(self, user_id):
+        key = f"user_members:{user_id}"
+        keys = await self.smembers(key, False)
+
+        if not keys:
+            keys = await self.sscan("member_keys", match=f"member:*:{user_id}", count=5000)
+            await self.sadd(key, *(keys or [""]))
+            await self.expire(key, 86400 if keys else 900)
+
+        return [x for x in keys if x]
+
     async def get_user(self, user_id):
-        result = await self._members_get("member", second=user_id)
+        keys = await self._user_member_keys(user_id)
+        if not keys:
+            return None
 
-        if result:
-            return User(state=self, data=result["user"])
+        results = await self.redis.mget(*keys)
+        stale = [keys[index] for index, value in enumerate(results) if value is None]
+
+        if stale:
+            await self.srem(f"user_members:{user_id}", *stale)
+
+        for result in results:
+            if result is not None:
+                return User(state=self, data=self._loads(result, True)["user"])
 
         return None
 
@@ -262,7 +422,7 @@ class State:
         return await self._guilds()
 
     async def _get_guild(self, guild_id):
-        result = await self.get(f"guild:{guild_id}")
+        result = await self._get_cached(f"guild:{guild_id}")
 
         if result:
             guild = Guild(state=self, data=result)
@@ -313,8 +473,11 @@ class State:
     def _remove_private_channel(self, channel):
         return
 
-    async def _get_message(self, msg_id):
-        result = await self._members_get("message", second=msg_id)
+    async def _get_message(self, msg_id, channel_id=None):
+        if channel_id:
+            result = await self.get(f"message:{channel_id}:{msg_id}")
+        else:
+            result = await self._members_get("message", second=msg_id)
 
         if result:
             channel = await self.get_channel(self._key_first(result))
@@ -381,7 +544,9 @@ class State:
         self.dispatch("resumed")
 
     async def parse_message_create(self, data, old):
-        channel = await self.get_channel(int(data["channel_id"]))
+        channel = await self.get_channel(
+            int(data["channel_id"]), utils._get_as_snowflake(data, "guild_id")
+        )
 
         if not channel and not data.get("guild_id"):
             channel = DMChannel(me=await self.user(), state=self, data={"id": data["channel_id"]})
@@ -390,6 +555,9 @@ class State:
             message = self.create_message(channel=channel, data=data)
             self.dispatch("message", message)
 
+            if not data.get("webhook_id"):
+                await self._store_user(data["author"])
+
     async def parse_message_delete(self, data, old):
         raw = RawMessageDeleteEvent(data)
 
@@ -449,7 +617,7 @@ class State:
 
         self.dispatch("raw_reaction_add", raw)
 
-        message = await self._get_message(raw.message_id)
+        message = await self._get_message(raw.message_id, raw.channel_id)
         if message:
             reaction = Reaction(
                 message=message, data=data, emoji=await self._upgrade_partial_emoji(emoji)
@@ -463,7 +631,7 @@ class State:
         raw = RawReactionClearEvent(data)
         self.dispatch("raw_reaction_clear", raw)
 
-        message = await self._get_message(raw.message_id)
+        message = await self._get_message(raw.message_id, raw.channel_id)
         if message:
             self.dispatch("reaction_clear", message, None)
 
@@ -477,7 +645,7 @@ class State:
         raw = RawReactionActionEvent(data, emoji, "REACTION_REMOVE")
         self.dispatch("raw_reaction_remove", raw)
 
-        message = await self._get_message(raw.message_id)
+        message = await self._get_message(raw.message_id, raw.channel_id)
         if message:
             reaction = Reaction(
                 message=message, data=data, emoji=await self._upgrade_partial_emoji(emoji)
@@ -497,7 +665,7 @@ class State:
         raw = RawReactionClearEmojiEvent(data, emoji)
         self.dispatch("raw_reaction_clear_emoji", raw)
 
-        message = await self._get_message(raw.message_id)
+        message = await self._get_message(raw.message_id, raw.channel_id)
         if message:
             reaction = Reaction(
                 message=message, data=data, emoji=await self._upgrade_partial_emoji(emoji)
@@ -532,7 +700,23 @@ class State:
         invite = Invite.from_gateway(state=self, data=data)
         self.dispatch("invite_delete", invite)
 
+    async def _update_ticket(self, data, delete=False):
+        topic = data.get("topic")
+        if not data.get("guild_id") or not tools.is_modmail_topic(topic):
+            return
+
+        key = f"ticket:{data['guild_id']}:{topic.split()[2]}"
+        if not delete:
+            await self.set(key, data["id"])
+        elif await self.get(key) == int(data["id"]):
+            await self.delete(key)
+
     async def parse_channel_delete(self, data, old):
+        self._invalidate(f"channel:{data['id']}")
+        self.caches["overwrites"].delete(int(data["id"]))
+        await self._update_ticket(data, delete=True)
+        await self.delete(f"transcript:{data['id']}")
+
         if old and old["guild_id"]:
             guild = await self._get_guild(utils._get_as_snowflake(data, "guild_id"))
             if guild:
@@ -544,6 +728,10 @@ class State:
             self.dispatch("private_channel_delete", channel)
 
     async def parse_channel_update(self, data, old):
+        self._invalidate(f"channel:{data['id']}")
+        self.caches["overwrites"].delete(int(data["id"]))
+        await self._update_ticket(data)
+
         channel_type = try_enum(ChannelType, data.get("type"))
         if old and channel_type is ChannelType.private:
             channel = DMChannel(me=self.user, state=self, data=data)
@@ -559,6 +747,9 @@ class State:
                 self.dispatch("guild_channel_update", old_channel, channel)
 
     async def parse_channel_create(self, data, old):
+        self._invalidate(f"channel:{data['id']}")
+        await self._update_ticket(data)
+
         factory, ch_type = _channel_factory(data["type"])
         if ch_type is ChannelType.private:
             channel = DMChannel(me=self.user, data=data, state=self)
@@ -589,19 +780,35 @@ class State:
         return
 
     async def parse_guild_member_add(self, data, old):
+        await self.delete(f"member_cache:{data['guild_id']}:{data['user']['id']}")
+        await self._store_user(data["user"])
+
         guild = await self._get_guild(int(data["guild_id"]))
         if guild:
             member = Member(guild=guild, data=data, state=self)
             self.dispatch("member_join", member)
 
     async def parse_guild_member_remove(self, data, old):
+        await self.delete(f"member_cache:{data['guild_id']}:{data['user']['id']}")
+
         if old:
             guild = await self._get_guild(int(data["guild_id"]))
             if guild:
                 member = Member(guild=guild, data=old, state=self)
                 self.dispatch("member_remove", member)
 
+    async def _store_me(self, guild_id, data):
+        self.caches["me"].set(guild_id, data)
+        await self.set(f"bot_member:{guild_id}", data)
+        await self.expire(f"bot_member:{guild_id}", 86400)
+
     async def parse_guild_member_update(self, data, old):
+        await self.delete(f"member_cache:{data['guild_id']}:{data['user']['id']}")
+        await self._store_user(data["user"])
+
+        if int(data["user"]["id"]) == self.id:
+            await self._store_me(int(data["guild_id"]), data)
+
         guild = await self._get_guild(int(data["guild_id"]))
         if old and guild:
             member = await guild.get_member(int(data["user"]["id"]))
@@ -653,6 +860,8 @@ class State:
         return
 
     async def parse_guild_update(self, data, old):
+        self._invalidate(f"guild:{data['id']}")
+
         guild = await self._get_guild(int(data["id"]))
         if guild:
             old_guild = None
@@ -664,6 +873,12 @@ class State:
             self.dispatch("guild_update", old_guild, guild)
 
     async def parse_guild_delete(self, data, old):
+        self._invalidate(f"guild:{data['id']}")
+
+        if not data.get("unavailable", False):
+            self.caches["me"].delete(int(data["id"]))
+            await self.delete(f"bot_member:{data['id']}")
+
         if old:
             old = Guild(state=self, data=old)
             if data.get("unavailable", False):
@@ -685,12 +900,18 @@ class State:
             self.dispatch("member_unban", guild, self.store_user(data["user"]))
 
     async def parse_guild_role_create(self, data, old):
+        self._invalidate(f"role:{data['guild_id']}:{data['role']['id']}")
+        self.caches["roles"].delete(int(data["guild_id"]))
+
         guild = await self._get_guild(int(data["guild_id"]))
         if guild:
             role = Role(guild=guild, state=self, data=data["role"])
             self.dispatch("guild_role_create", role)
 
     async def parse_guild_role_delete(self, data, old):
+        self._invalidate(f"role:{data['guild_id']}:{data['role_id']}")
+        self.caches["roles"].delete(int(data["guild_id"]))
+
         if old:
             guild = await self._get_guild(int(data["guild_id"]))
             if guild:
@@ -698,6 +919,9 @@ class State:
                 self.dispatch("guild_role_delete", role)
 
     async def parse_guild_role_update(self, data, old):
+        self._invalidate(f"role:{data['guild_id']}:{data['role']['id']}")
+        self.caches["roles"].delete(int(data["guild_id"]))
+
         if old:
             guild = await self._get_guild(int(data["guild_id"]))
             if guild:
@@ -782,26 +1006,70 @@ class State:
 
         return await self.get_emoji(emoji.id)
 
-    async def _get_channel(self, channel_id):
-        result = await self.get(f"channel:{channel_id}")
+    def _create_channel(self, data, guilds):
+        if not data:
+            return None
 
-        if result:
-            if result.get("guild_id"):
-                factory, _ = _channel_factory(result["type"])
-                guild = await self._get_guild(result["guild_id"])
+        if not data.get("guild_id"):
+            return DMChannel(me=self.user, state=self, data=data)
 
-                if guild:
-                    return factory(guild=guild, state=self, data=result)
-            else:
-                return DMChannel(me=self.user, state=self, data=result)
+        guild = guilds.get(int(data["guild_id"]))
+        if guild is None:
+            return None
 
-        return None
+        factory, _ = _channel_factory(data["type"])
+        return factory(guild=guild, state=self, data=data)
+
+    async def _get_guilds(self, guild_ids):
+        guilds = {}
+
+        keys = [f"guild:{x}" for x in set(guild_ids)]
+        for result in (await self._get_cached_many(keys)).values():
+            if result:
+                guild = Guild(state=self, data=result)
+                if not guild.unavailable:
+                    guilds[guild.id] = guild
+
+        return guilds
 
-    async def get_channel(self, channel_id):
+    async def _get_channel(self, channel_id, guild_id=None):
+        keys = [f"channel:{channel_id}"]
+        if guild_id:
+            keys.append(f"guild:{guild_id}")
+
+        results = await self._get_cached_many(keys)
+        result = results[keys[0]]
+
+        if not result or not result.get("guild_id"):
+            return self._create_channel(result, {})
+
+        if guild_id and int(result["guild_id"]) == int(guild_id) and results[keys[1]]:
+            guild = Guild(state=self, data=results[keys[1]])
+            guilds = {} if guild.unavailable else {guild.id: guild}
+        else:
+            guilds = await self._get_guilds([result["guild_id"]])
+
+        return self._create_channel(result, guilds)
+
+    async def get_channel(self, channel_id, guild_id=None):
         if not channel_id:
             return None
 
-        return await self._get_channel(channel_id)
+        return await self._get_channel(channel_id, guild_id)
+
+    async def get_channels(self, channel_ids):
+        results = await self._get_cached_many([f"channel:{x}" for x in channel_ids])
+        guilds = await self._get_guilds(
+            [x["guild_id"] for x in results.values() if x and x.get("guild_id")]
+        )
+
+        channels = []
+        for channel_id in channel_ids:
+            channel = self._create_channel(results[f"channel:{channel_id}"], guilds)
+            if channel:
+                channels.append(channel)
+
+        return channels
 
     def create_message(self, *, channel, data):
         message = Message(state=self, channel=channel, data=data)
@@ -51,11 +51,11 @@ class Configuration(commands.Cog):
         msg = await ctx.send(Embed("Setting up..."))
 
         data = await tools.get_data(self.bot, ctx.guild.id)
-        if await ctx.guild.get_channel(data[2]):
+        if await ctx.guild.get_channel(data.category):
             await msg.edit(ErrorEmbed("The bot has already been set up."))
             return
 
-        overwrites = await self._get_overwrites(ctx, data[3])
+        overwrites = await self._get_overwrites(ctx, data.access_roles)
         category = await ctx.guild.create_category(name="ModMail", overwrites=overwrites)
         logging_channel = await ctx.guild.create_text_channel(name="modmail-log", category=category)
 
@@ -67,6 +67,8 @@ class Configuration(commands.Cog):
                 ctx.guild.id,
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await msg.edit(
             Embed(
                 "Premium",
@@ -114,7 +116,10 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute("UPDATE data SET prefix=$1 WHERE guild=$2", prefix, ctx.guild.id)
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await self.bot.state.set(f"prefix:{ctx.guild.id}", "" if prefix is None else prefix)
+        await tools.invalidate_cache(self.bot, "prefix", ctx.guild.id)
 
         await ctx.send(
             Embed(
@@ -136,7 +141,7 @@ class Configuration(commands.Cog):
             return
 
         data = await tools.get_data(self.bot, ctx.guild.id)
-        if await ctx.guild.get_channel(data[2]):
+        if await ctx.guild.get_channel(data.category):
             await ctx.send(
                 ErrorEmbed(
                     "A ModMail category already exists. Please delete that category and try again."
@@ -144,7 +149,7 @@ class Configuration(commands.Cog):
             )
             return
 
-        overwrites = await self._get_overwrites(ctx, data[3])
+        overwrites = await self._get_overwrites(ctx, data.access_roles)
         category = await ctx.guild.create_category(name=name, overwrites=overwrites)
 
         async with self.bot.pool.acquire() as conn:
@@ -152,6 +157,8 @@ class Configuration(commands.Cog):
                 "UPDATE data SET category=$1 WHERE guild=$2", category.id, ctx.guild.id
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("Successfully created the category."))
 
     @checks.bot_has_permissions(manage_channels=True, manage_roles=True)
@@ -192,18 +199,21 @@ class Configuration(commands.Cog):
                 ctx.guild.id,
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         data = await tools.get_data(self.bot, ctx.guild.id)
-        category = await ctx.guild.get_channel(data[2])
+        category = await ctx.guild.get_channel(data.category)
 
         if category and roles:
             try:
-                for role in old_data[3]:
+                for role in old_data.access_roles:
                     role = await ctx.guild.get_role(role)
 
                     if role:
                         await category.set_permissions(target=role, overwrite=None)
 
-                for role, permission in (await self._get_overwrites(ctx, data[3])).items():
+                overwrites = await self._get_overwrites(ctx, data.access_roles)
+                for role, permission in overwrites.items():
                     await category.set_permissions(target=role, overwrite=permission)
             except Forbidden:
                 await msg.edit(
@@ -258,6 +268,8 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute("UPDATE data SET pingrole=$1 WHERE guild=$2", role_ids, ctx.guild.id)
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("The role(s) are updated successfully."))
 
     @checks.bot_has_permissions(manage_channels=True)
@@ -272,14 +284,16 @@ class Configuration(commands.Cog):
     async def logging(self, ctx, channel: typing.Optional[ChannelConverter]):
         data = await tools.get_data(self.bot, ctx.guild.id)
 
-        if data[4] and channel is None:
+        if data.logging and channel is None:
             async with self.bot.pool.acquire() as conn:
                 await conn.execute("UPDATE data SET logging=$1 WHERE guild=$2", None, ctx.guild.id)
 
+            await tools.invalidate_data(self.bot, ctx.guild.id)
+
             await ctx.send(Embed("ModMail logging is disabled. You may delete the channel."))
             return
 
-        category = await ctx.guild.get_channel(data[2])
+        category = await ctx.guild.get_channel(data.category)
         if category is None:
             await ctx.send(
                 ErrorEmbed(
@@ -297,6 +311,8 @@ class Configuration(commands.Cog):
                 "UPDATE data SET logging=$1 WHERE guild=$2", channel.id, ctx.guild.id
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("ModMail logging is enabled."))
 
     @checks.in_database()
@@ -313,12 +329,16 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute(
                 "UPDATE data SET commandonly=$1 WHERE guild=$2",
-                True if data[11] is False else False,
+                True if data.command_only is False else False,
                 ctx.guild.id,
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(
-            Embed(f"Command only mode is {'enabled' if data[11] is False else 'disabled'}.")
+            Embed(
+                f"Command only mode is {'enabled' if data.command_only is False else 'disabled'}."
+            )
         )
 
     @checks.in_database()
@@ -335,6 +355,8 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute("UPDATE data SET welcome=$1 WHERE guild=$2", text, ctx.guild.id)
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("The greeting message is set successfully."))
 
     @checks.in_database()
@@ -351,6 +373,8 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute("UPDATE data SET goodbye=$1 WHERE guild=$2", text, ctx.guild.id)
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("The closing message is set successfully."))
 
     @checks.in_database()
@@ -369,13 +393,15 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute(
                 "UPDATE data SET loggingplus=$1 WHERE guild=$2",
-                (data[7] + 1) % 3,
+                (data.logging_plus + 1) % 3,
                 ctx.guild.id,
             )
 
-        if data[7] == 0:
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
+        if data.logging_plus == 0:
             await ctx.send(Embed("Advanced logging is enabled with AI summary."))
-        elif data[7] == 1:
+        elif data.logging_plus == 1:
             await ctx.send(Embed("Advanced logging is enabled without AI summary."))
         else:
             await ctx.send(Embed("Advanced logging is disabled."))
@@ -390,12 +416,14 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute(
                 "UPDATE data SET anonymous=$1 WHERE guild=$2",
-                True if data[10] is False else False,
+                True if data.anonymous is False else False,
                 ctx.guild.id,
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(
-            Embed(f"Anonymous messaging is {'enabled' if data[10] is False else 'disabled'}.")
+            Embed(f"Anonymous messaging is {'enabled' if data.anonymous is False else 'disabled'}.")
         )
 
     @checks.in_database()
@@ -412,12 +440,14 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute(
                 "UPDATE data SET toggle=$1 WHERE guild=$2",
-                reason if data[12] is None else None,
+                reason if data.toggle is None else None,
                 ctx.guild.id,
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(
-            Embed(f"Ticket creation is {'disabled' if data[12] is None else 'enabled'}.")
+            Embed(f"Ticket creation is {'disabled' if data.toggle is None else 'enabled'}.")
         )
 
     @checks.in_database()
@@ -432,6 +462,8 @@ class Configuration(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute("UPDATE data SET aiprompt=$1 WHERE guild=$2", text, ctx.guild.id)
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("The AI prompt is set successfully."))
 
     @checks.in_database()
@@ -442,15 +474,15 @@ class Configuration(commands.Cog):
     )
     async def viewconfig(self, ctx):
         data = await tools.get_data(self.bot, ctx.guild.id)
-        category = await ctx.guild.get_channel(data[2])
-        logging = await ctx.guild.get_channel(data[4])
+        category = await ctx.guild.get_channel(data.category)
+        logging = await ctx.guild.get_channel(data.logging)
 
         access = []
-        for role in data[3]:
+        for role in data.access_roles:
             access.append(f"<@&{role}>")
 
         ping = []
-        for role in data[8]:
+        for role in data.ping_roles:
             if role == -1:
                 ping.append("@here")
             elif role == ctx.guild.id:
@@ -459,28 +491,28 @@ class Configuration(commands.Cog):
                 ping.append(f"<@&{role}>")
 
         loggingplus = ""
-        if data[7] == 0:
+        if data.logging_plus == 0:
             loggingplus = "Disabled"
-        elif data[7] == 1:
+        elif data.logging_plus == 1:
             loggingplus = "Enabled with AI summary"
         else:
             loggingplus = "Enabled without AI summary"
 
-        toggle = data[12]
+        toggle = data.toggle
         if toggle and len(toggle) > 989:
             toggle = toggle[:986] + "..."
         elif toggle == "":
             toggle = "No reason was provided."
 
-        greeting = data[5]
+        greeting = data.welcome
         if greeting and len(greeting) > 1000:
             greeting = greeting[:997] + "..."
 
-        closing = data[6]
+        closing = data.goodbye
         if closing and len(closing) > 1000:
             closing = closing[:997] + "..."
 
-        prompt = data[13]
+        prompt = data.ai_prompt
         if prompt and len(prompt) > 1000:
             prompt = prompt[:997] + "..."
 
@@ -491,8 +523,8 @@ class Configuration(commands.Cog):
         embed.add_field("Ping Roles", "*Not set*" if len(ping) == 0 else " ".join(ping))
         embed.add_field("Logging", "*Not set*" if logging is None else f"<#{logging.id}>")
         embed.add_field("Advanced Logging", loggingplus)
-        embed.add_field("Anonymous Messaging", "Enabled" if data[10] is True else "Disabled")
-        embed.add_field("Command Only", "Enabled" if data[11] is True else "Disabled")
+        embed.add_field("Anonymous Messaging", "Enabled" if data.anonymous is True else "Disabled")
+        embed.add_field("Command Only", "Enabled" if data.command_only is True else "Disabled")
         embed.add_field("Ticket Creation", "Enabled" if toggle is None else f"Disabled ({toggle})")
         embed.add_field("Greeting Message", "*Not set*" if greeting is None else greeting, False)
         embed.add_field("Closing Message", "*Not set*" if closing is None else closing, False)
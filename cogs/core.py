@@ -1,14 +1,14 @@
 import asyncio
-import copy
 import io
 import logging
-import time
 
 import discord
 
 from discord.ext import commands
 
+from classes.context import Context
 from classes.embed import Embed, ErrorEmbed
+from classes.message import Message
 from utils import checks, tools
 from utils.converters import UserConverter
 
@@ -18,6 +18,10 @@ log = logging.getLogger(__name__)
 class Core(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.resume_task = self.bot.loop.create_task(self.resume_bulk_closes())
+
+    def cog_unload(self):
+        self.resume_task.cancel()
 
     @checks.is_modmail_channel()
     @checks.in_database()
@@ -58,15 +62,15 @@ class Core(commands.Cog):
         data = await tools.get_data(self.bot, ctx.guild.id)
 
         history = await self.generate_history(ctx.channel)
-        truncated_history = "\n".join(history.splitlines()[-100:])
+        truncated_history = "\n".join(history[-100:])
         prompt = (
             "You are a Discord moderator for a server. The following is the entire history of "
             "the conversation between staff and the user. Please fill in the suitable response "
             "given the transcript. Only give 1 response option. Do not output additional text such "
             "as 'My response would be...'. Try to appear as supportive as possible.\nHere are "
-            f"additional information you should consider (if any): {data[13]}\nHere are additional "
-            f"instructions for your response (if any): {instructions}\n\nFull transcript: "
-            f"{truncated_history}.\n\nStaff response: "
+            f"additional information you should consider (if any): {data.ai_prompt}\nHere are "
+            f"additional instructions for your response (if any): {instructions}\n\nFull "
+            f"transcript: {truncated_history}.\n\nStaff response: "
         )
 
         try:
@@ -82,79 +86,86 @@ class Core(commands.Cog):
 
         msg = await ctx.send(Embed("AI Reply", response[:2048]))
 
-        await msg.add_reaction("✅")
-        await msg.add_reaction("❌")
+        await tools.add_reactions(msg, ["✅", "❌"])
 
-        await self.bot.state.set(
-            f"reaction_menu:{msg.channel.id}:{msg.id}",
+        await tools.set_reaction_menu(
+            self.bot,
+            msg.channel.id,
+            msg.id,
+            "aireply",
             {
-                "kind": "aireply",
-                "end": int(time.time()) + 180,
-                "data": {
-                    "anon": data[10],
-                    "prefix": ctx.prefix,
-                    "author": ctx.author.id,
-                    "guild": ctx.guild.id,
-                },
+                "anon": data.anonymous,
+                "prefix": ctx.prefix,
+                "author": ctx.author.id,
+                "guild": ctx.guild.id,
             },
         )
-        await self.bot.state.sadd(
-            "reaction_menu_keys",
-            f"reaction_menu:{msg.channel.id}:{msg.id}",
-        )
 
-    async def generate_history(self, channel):
-        history = ""
-        messages = await channel.history(limit=10000).flatten()
-
-        for message in messages:
-            if message.author.bot and (
-                message.author.id != self.bot.id
-                or len(message.embeds) <= 0
-                or message.embeds[0].title not in ["Message Received", "Message Sent"]
-            ):
-                continue
-
-            if not message.author.bot and message.content == "":
-                continue
-
-            if message.author.bot:
-                if not message.embeds[0].author.name:
-                    author = f"{' '.join(message.embeds[0].footer.text.split()[:-2])} (User)"
-                elif message.embeds[0].author.name.endswith(" (Anonymous)"):
-                    author = f"{message.embeds[0].author.name[:-12]} (Staff)"
-                else:
-                    author = f"{message.embeds[0].author.name} (Staff)"
-
-                description = message.embeds[0].description
-
-                for attachment in [
-                    field.value
-                    for field in message.embeds[0].fields
-                    if field.name.startswith("Attachment ")
-                ]:
-                    if not description:
-                        description = f"(Attachment: {attachment})"
-                    else:
-                        description += f" (Attachment: {attachment})"
+    def _history_line(self, message):
+        if message.author.bot and (
+            message.author.id != self.bot.id
+            or len(message.embeds) <= 0
+            or message.embeds[0].title not in ["Message Received", "Message Sent"]
+        ):
+            return None
+
+        if not message.author.bot and message.content == "":
+            return None
+
+        if message.author.bot:
+            if not message.embeds[0].author.name:
+                author = f"{' '.join(message.embeds[0].footer.text.split()[:-2])} (User)"
+            elif message.embeds[0].author.name.endswith(" (Anonymous)"):
+                author = f"{message.embeds[0].author.name[:-12]} (Staff)"
             else:
-                author = f"{message.author} (Comment)"
-                description = message.content
+                author = f"{message.embeds[0].author.name} (Staff)"
 
-            history = (
-                f"[{str(message.created_at.replace(microsecond=0))}] {author}: {description}\n"
-                + history
-            )
+            description = message.embeds[0].description
+
+            for attachment in [
+                field.value
+                for field in message.embeds[0].fields
+                if field.name.startswith("Attachment ")
+            ]:
+                if not description:
+                    description = f"(Attachment: {attachment})"
+                else:
+                    description += f" (Attachment: {attachment})"
+        else:
+            author = f"{message.author} (Comment)"
+            description = message.content
+
+        return f"[{str(message.created_at.replace(microsecond=0))}] {author}: {description}"
 
-        return history
+    async def generate_history(self, channel, file=None):
+        lines = await tools.get_transcript(self.bot, channel)
+
+        if lines is None:
+            lines = []
+
+            async for message in channel.history(limit=10000):
+                line = self._history_line(message)
+                if line is not None:
+                    lines.append(line)
+
+            lines.reverse()
+
+        if file is not None:
+            for line in lines:
+                file.write(f"{line}\n".encode())
+
+            file.seek(0)
+
+        return lines
 
     async def close_channel(self, ctx, reason, anon: bool = False):
         await ctx.send(Embed("Closing ticket..."))
 
         data = await tools.get_data(self.bot, ctx.guild.id)
 
-        if data[7] > 0:
-            history = await self.generate_history(ctx.channel)
+        if data.logging_plus > 0:
+            log_file = io.BytesIO()
+            history = await self.generate_history(ctx.channel, log_file)
 
         try:
             await ctx.channel.delete()
@@ -162,6 +173,9 @@ class Core(commands.Cog):
             await ctx.send(ErrorEmbed("Missing permissions to delete this channel."))
             return
 
+        await tools.remove_ticket(self.bot, ctx.channel)
+        await tools.remove_transcript(self.bot, ctx.channel)
+
         embed = ErrorEmbed(
             "Ticket Closed",
             reason if reason else "No reason was provided.",
@@ -172,17 +186,14 @@ class Core(commands.Cog):
         if anon is False:
             embed.set_author(str(ctx.author), ctx.author.avatar_url)
 
-        try:
-            member = await ctx.guild.fetch_member(tools.get_modmail_user(ctx.channel).id)
-        except discord.NotFound:
-            member = None
-        else:
+        member = await ctx.guild.find_member(tools.get_modmail_user(ctx.channel).id)
+        if member is not None:
             dm_channel = tools.get_modmail_channel(self.bot, ctx.channel)
 
-            if data[6]:
+            if data.goodbye:
                 embed2 = Embed(
                     "Closing Message",
-                    tools.tag_format(data[6], member),
+                    tools.tag_format(data.goodbye, member),
                     colour=0xFF4500,
                     timestamp=True,
                 )
@@ -197,10 +208,10 @@ class Core(commands.Cog):
             except discord.Forbidden:
                 pass
 
-        if data[4] is None:
+        if data.logging is None:
             return
 
-        channel = await ctx.guild.get_channel(data[4])
+        channel = await ctx.guild.get_channel(data.logging)
         if channel is None:
             return
 
@@ -223,9 +234,9 @@ class Core(commands.Cog):
             ctx.author.avatar_url,
         )
 
-        if data[7] > 0:
+        if data.logging_plus > 0:
             file = discord.File(
-                io.BytesIO(history.encode()),
+                log_file,
                 f"modmail_log_{tools.get_modmail_user(ctx.channel).id}.txt",
             )
 
@@ -234,9 +245,9 @@ class Core(commands.Cog):
             except discord.Forbidden:
                 return
 
-            if self.bot.ai is not None and data[7] == 1:
+            if self.bot.ai is not None and data.logging_plus == 1:
                 try:
-                    truncated_history = "\n".join(history.splitlines()[-100:])
+                    truncated_history = "\n".join(history[-100:])
                     summary = await self.bot.ai_generate(
                         "The following is the entire history of the conversation between staff and "
                         "the user. Please summarise the entire interaction into 1 or 2 sentences. "
@@ -280,23 +291,114 @@ class Core(commands.Cog):
     async def aclose(self, ctx, *, reason: str = None):
         await self.close_channel(ctx, reason, True)
 
+    async def start_bulk_close(self, ctx, reason, anon=False):
+        key = f"bulk_close:{ctx.guild.id}"
+        if await self.bot.state.get(key) is not None:
+            await ctx.send(ErrorEmbed("The tickets in this server are already being closed."))
+            return
+
+        channels = [x.id for x in await ctx.guild.text_channels() if tools.is_modmail_channel(x)]
+        status = await ctx.send(Embed("Closing Tickets", f"0/{len(channels)} tickets closed."))
+
+        job = {
+            "guild": ctx.guild.id,
+            "channel": ctx.channel.id,
+            "message": ctx.message._data,
+            "status": status.id,
+            "channels": channels,
+            "total": len(channels),
+            "reason": reason,
+            "anon": anon,
+        }
+
+        await self.bot.state.set(key, job)
+        await self.bot.state.sadd("bulk_close_keys", key)
+        self.bot.loop.create_task(self.run_bulk_close(key, job))
+
+    async def run_bulk_close(self, key, job):
+        if not await self.bot.state.set(f"{key}:lock", self.bot.cluster, expire=60, nx=True):
+            return
+
+        channel = tools.create_fake_channel(self.bot, job["channel"])
+        status = tools.create_fake_message(self.bot, channel, job["status"])
+        semaphore = asyncio.Semaphore(5)
+        closed = set()
+
+        async def close(guild, channel_id):
+            async with semaphore:
+                try:
+                    ticket = await guild.get_channel(channel_id) if guild else None
+
+                    if ticket and tools.is_modmail_channel(ticket):
+                        message = Message(state=self.bot.state, channel=ticket, data=job["message"])
+                        ctx = await self.bot.get_context(message, cls=Context)
+                        await self.close_channel(ctx, job["reason"], job["anon"])
+                except Exception:
+                    log.exception(f"Failed to close ticket {channel_id}.")
+
+                closed.add(channel_id)
+
+        async def report():
+            while True:
+                await asyncio.sleep(5)
+
+                job["channels"] = [x for x in job["channels"] if x not in closed]
+                await self.bot.state.set(key, job)
+                await self.bot.state.expire(f"{key}:lock", 60)
+
+                try:
+                    await status.edit(
+                        Embed(
+                            "Closing Tickets",
+                            f"{job['total'] - len(job['channels'])}/{job['total']} tickets closed.",
+                        )
+                    )
+                except discord.HTTPException:
+                    pass
+
+        reporter = self.bot.loop.create_task(report())
+        result = "All tickets are successfully closed."
+        if job["anon"] is True:
+            result = "All tickets are successfully closed anonymously."
+
+        try:
+            guild = await self.bot.get_guild(job["guild"])
+            await asyncio.gather(*[close(guild, x) for x in job["channels"]])
+        except Exception:
+            log.exception(f"Failed to close tickets for {key}.")
+            result = "Something went wrong while closing the tickets. Please try again."
+        finally:
+            reporter.cancel()
+
+        await self.bot.state.delete(key)
+        await self.bot.state.srem("bulk_close_keys", key)
+        await self.bot.state.delete(f"{key}:lock")
+
+        try:
+            await status.edit(Embed("Closing Tickets", result))
+        except discord.HTTPException:
+            pass
+
+    async def resume_bulk_closes(self):
+        while True:
+            for key in await self.bot.state.smembers("bulk_close_keys"):
+                job = await self.bot.state.get(key)
+
+                if job is None:
+                    await self.bot.state.srem("bulk_close_keys", key)
+                    continue
+
+                self.bot.loop.create_task(self.run_bulk_close(key, job))
+
+            await asyncio.sleep(60)
+
     @checks.in_database()
     @checks.is_mod()
     @checks.bot_has_permissions(manage_channels=True)
     @commands.guild_only()
     @commands.command(description="Close all the tickets.", usage="closeall [reason]")
     async def closeall(self, ctx, *, reason: str = None):
-        for channel in await ctx.guild.text_channels():
-            if tools.is_modmail_channel(channel):
-                msg = copy.copy(ctx.message)
-                msg.channel = channel
-                new_ctx = await self.bot.get_context(msg, cls=type(ctx))
-                await self.close_channel(new_ctx, reason)
-
-        try:
-            await ctx.send(Embed("All tickets are successfully closed."))
-        except discord.HTTPException:
-            pass
+        await self.start_bulk_close(ctx, reason)
 
     @checks.in_database()
     @checks.is_mod()
@@ -304,17 +406,7 @@ class Core(commands.Cog):
     @commands.guild_only()
     @commands.command(description="Close all the tickets anonymously.", usage="acloseall [reason]")
     async def acloseall(self, ctx, *, reason: str = None):
-        for channel in await ctx.guild.text_channels():
-            if tools.is_modmail_channel(channel):
-                msg = copy.copy(ctx.message)
-                msg.channel = channel
-                new_ctx = await self.bot.get_context(msg, cls=type(ctx))
-                await self.close_channel(new_ctx, reason, True)
-
-        try:
-            await ctx.send(Embed("All tickets are successfully closed anonymously."))
-        except discord.HTTPException:
-            pass
+        await self.start_bulk_close(ctx, reason, True)
 
     @checks.in_database()
     @checks.is_mod()
@@ -342,7 +434,7 @@ class Core(commands.Cog):
             await ctx.send(ErrorEmbed("The user(s) are not found. Please try again."))
             return
 
-        blacklist = (await tools.get_data(self.bot, ctx.guild.id))[9]
+        blacklist = list((await tools.get_data(self.bot, ctx.guild.id)).blacklist)
         for user in users:
             if user.id not in blacklist:
                 blacklist.append(user.id)
@@ -352,6 +444,8 @@ class Core(commands.Cog):
                 "UPDATE data SET blacklist=$1 WHERE guild=$2", blacklist, ctx.guild.id
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("The user(s) are blacklisted successfully."))
 
     @checks.in_database()
@@ -380,7 +474,7 @@ class Core(commands.Cog):
             await ctx.send(ErrorEmbed("The user(s) are not found. Please try again."))
             return
 
-        blacklist = (await tools.get_data(self.bot, ctx.guild.id))[9]
+        blacklist = list((await tools.get_data(self.bot, ctx.guild.id)).blacklist)
         for user in users:
             if user.id in blacklist:
                 blacklist.remove(user.id)
@@ -390,6 +484,8 @@ class Core(commands.Cog):
                 "UPDATE data SET blacklist=$1 WHERE guild=$2", blacklist, ctx.guild.id
             )
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("The user(s) are whitelisted successfully."))
 
     @checks.in_database()
@@ -400,6 +496,8 @@ class Core(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute("UPDATE data SET blacklist=$1 WHERE guild=$2", [], ctx.guild.id)
 
+        await tools.invalidate_data(self.bot, ctx.guild.id)
+
         await ctx.send(Embed("The blacklist is cleared successfully."))
 
     @checks.in_database()
@@ -407,7 +505,7 @@ class Core(commands.Cog):
     @commands.guild_only()
     @commands.command(description="View the blacklist.", usage="viewblacklist")
     async def viewblacklist(self, ctx):
-        blacklist = (await tools.get_data(self.bot, ctx.guild.id))[9]
+        blacklist = (await tools.get_data(self.bot, ctx.guild.id)).blacklist
         if not blacklist:
             await ctx.send(Embed("No one is blacklisted."))
             return
@@ -1,14 +1,12 @@
 import io
 import logging
 import string
-import time
 
 import discord
 
 from discord.ext import commands
 
 from classes.embed import Embed, ErrorEmbed
-from classes.message import Message
 from utils import tools
 from utils.converters import GuildConverter
 
@@ -27,9 +25,8 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
             await message.channel.send(ErrorEmbed("The server was not found."))
             return
 
-        try:
-            member = await guild.fetch_member(message.author.id)
-        except discord.NotFound:
+        member = await guild.find_member(message.author.id)
+        if member is None:
             await message.channel.send(
                 ErrorEmbed("You are not in that server, and the message is not sent.")
             )
@@ -37,7 +34,7 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
 
         data = await tools.get_data(self.bot, guild.id)
 
-        category = await guild.get_channel(data[2])
+        category = await guild.get_channel(data.category)
         if not category:
             await message.channel.send(
                 ErrorEmbed(
@@ -46,23 +43,19 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
             )
             return
 
-        if message.author.id in data[9]:
+        if message.author.id in data.blacklist:
             await message.channel.send(
                 ErrorEmbed("That server has blacklisted you from sending a message there.")
             )
             return
 
-        channel = None
-        for text_channel in await guild.text_channels():
-            if tools.is_modmail_channel(text_channel, message.author.id):
-                channel = text_channel
-                break
+        channel = await tools.get_ticket_channel(self.bot, guild, message.author.id)
 
         if channel is None:
-            if data[12] is not None:
+            if data.toggle is not None:
                 embed = ErrorEmbed(
                     "Ticket Creation Disabled",
-                    data[12] if data[12] else "No reason was provided.",
+                    data.toggle if data.toggle else "No reason was provided.",
                     timestamp=True,
                 )
                 embed.set_footer(f"{guild.name} | {guild.id}", guild.icon_url)
@@ -114,7 +107,12 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
                     )
                     return
 
-            log_channel = await guild.get_channel(data[4])
+            await tools.add_ticket(self.bot, channel)
+
+            if data.logging_plus > 0:
+                await tools.start_transcript(self.bot, channel)
+
+            log_channel = await guild.get_channel(data.logging)
             if log_channel:
                 embed = Embed(
                     title="New Ticket",
@@ -141,7 +139,7 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
                 timestamp=True,
             )
 
-            if data[11]:
+            if data.command_only:
                 embed.description = (
                     f"Type `{prefix}reply <message>` in this channel to reply. All other messages "
                     "are ignored, and can be used for staff discussion. Use the command "
@@ -164,7 +162,7 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
             embed.set_footer(f"{message.author} | {message.author.id}", message.author.avatar_url)
 
             roles = []
-            for role in data[8]:
+            for role in data.ping_roles:
                 if role == guild.id:
                     roles.append("@everyone")
                 elif role == -1:
@@ -182,10 +180,10 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
                 )
                 return
 
-            if data[5]:
+            if data.welcome:
                 embed = Embed(
                     "Greeting Message",
-                    tools.tag_format(data[5], message.author),
+                    tools.tag_format(data.welcome, message.author),
                     colour=0xFF4500,
                     timestamp=True,
                 )
@@ -215,16 +213,25 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
         ):
             embed.add_field(f"Attachment {count}", attachment, False)
 
-        for file in files:
-            file.reset()
+        tools.set_attachment_image(embed, dm_message.attachments)
 
         try:
-            await channel.send(embed, files=files)
+            ticket_message = await channel.send(embed)
         except discord.Forbidden:
             await dm_message.delete()
             await message.channel.send(
                 ErrorEmbed("The bot is missing permissions. Please contact an admin on the server.")
             )
+            return
+
+        await tools.add_transcript(
+            self.bot,
+            ticket_message,
+            f"{message.author.name} (User)",
+            message.content,
+            dm_message.attachments,
+        )
+        await tools.set_last_guild(self.bot, message.author.id, guild.id)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
@@ -240,7 +247,9 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
                 return
 
             guild = await self.bot.get_guild(menu["data"]["guild"])
-            message = Message(state=self.bot.state, channel=channel, data=menu["data"]["msg"])
+            message = tools.create_fake_message(
+                self.bot, channel, menu["data"]["msg"]["id"], menu["data"]["msg"]
+            )
 
             if payload.emoji.name == "✅":
                 await self.send_mail(message, guild)
@@ -252,14 +261,9 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
                 elif payload.emoji.name == "❌":
                     await msg.edit(ErrorEmbed("Request cancelled successfully."))
 
-                for reaction in ["✅", "🔁", "❌"]:
-                    await msg.remove_reaction(reaction, self.bot.user)
+                await tools.remove_reactions(self.bot, msg, ["✅", "🔁", "❌"])
 
-            await self.bot.state.delete(f"reaction_menu:{channel.id}:{msg.id}")
-            await self.bot.state.srem(
-                "reaction_menu_keys",
-                f"reaction_menu:{channel.id}:{msg.id}",
-            )
+            await tools.remove_reaction_menu(self.bot, channel.id, msg.id)
             return
 
         numbers = ["1⃣", "2⃣", "3⃣", "4⃣", "5⃣", "6⃣", "7⃣", "8⃣", "9⃣", "🔟"]
@@ -269,71 +273,59 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
             if menu is None:
                 return
 
-            page = menu["data"]["page"]
-            all_pages = menu["data"]["all_pages"]
+            page = menu["page"]
+            pages = menu["data"]["pages"]
 
             if payload.emoji.name not in arrows:
                 chosen = numbers.index(payload.emoji.name)
                 await msg.delete()
 
-                fields = all_pages[page]["fields"]
+                fields = tools.unpack_page(pages, page)["fields"]
                 if chosen > len(fields):
                     return
 
                 guild = await self.bot.get_guild(fields[chosen]["value"].split()[-1])
-                message = Message(state=self.bot.state, channel=channel, data=menu["data"]["msg"])
+                message = tools.create_fake_message(
+                    self.bot, channel, menu["data"]["msg"]["id"], menu["data"]["msg"]
+                )
                 await self.send_mail(message, guild)
 
-                await self.bot.state.delete(f"reaction_menu:{channel.id}:{msg.id}")
-                await self.bot.state.srem(
-                    "reaction_menu_keys",
-                    f"reaction_menu:{channel.id}:{msg.id}",
-                )
+                await tools.remove_reaction_menu(self.bot, channel.id, msg.id)
                 return
 
             if payload.emoji.name == "◀️" and page > 0:
                 page -= 1
 
-                new_page = Embed.from_dict(all_pages[page])
+                new_page = Embed.from_dict(tools.unpack_page(pages, page))
                 await msg.edit(new_page)
 
-                menu["data"]["page"] = page
-                menu["end"] = int(time.time()) + 180
-                await self.bot.state.set(f"reaction_menu:{channel.id}:{msg.id}", menu)
+                await tools.set_reaction_menu_page(self.bot, channel.id, msg.id, page)
 
-                for reaction in numbers[: len(new_page.fields)]:
-                    await msg.add_reaction(reaction)
+                previous = len(pages["pages"][page + 1]["fields"])
+                await tools.add_reactions(msg, numbers[previous : len(new_page.fields)])
 
-            if payload.emoji.name == "▶️" and page < len(all_pages) - 1:
+            if payload.emoji.name == "▶️" and page < len(pages["pages"]) - 1:
                 page += 1
 
-                new_page = Embed.from_dict(all_pages[page])
+                new_page = Embed.from_dict(tools.unpack_page(pages, page))
                 await msg.edit(new_page)
 
-                menu["data"]["page"] = page
-                menu["end"] = int(time.time()) + 180
-                await self.bot.state.set(f"reaction_menu:{channel.id}:{msg.id}", menu)
+                await tools.set_reaction_menu_page(self.bot, channel.id, msg.id, page)
 
-                for reaction in numbers[len(new_page.fields) :]:
-                    try:
-                        await msg.remove_reaction(reaction, self.bot.user)
-                    except discord.NotFound:
-                        pass
+                previous = len(pages["pages"][page - 1]["fields"])
+                await tools.remove_reactions(
+                    self.bot, msg, numbers[len(new_page.fields) : previous]
+                )
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if (
-            message.is_system()
-            or message.author.bot
-            or not isinstance(message.channel, discord.DMChannel)
-        ):
+    async def handle_message(self, message):
+        if message.is_system():
             return
 
         for prefix in [f"<@{self.bot.id}> ", f"<@!{self.bot.id}> ", self.bot.config.DEFAULT_PREFIX]:
             if message.content.startswith(prefix):
                 return
 
-        if await tools.is_user_banned(self.bot, message.author):
+        if await tools.is_message_author_banned(self.bot, message):
             await message.channel.send(ErrorEmbed("You are banned from this bot."))
             return
 
@@ -342,15 +334,21 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
         if self.bot.config.DEFAULT_SERVER is not None:
             guild = await self.bot.get_guild(int(self.bot.config.DEFAULT_SERVER))
         else:
-            async for msg in message.channel.history(limit=30):
-                if (
-                    msg.author.id == self.bot.id
-                    and len(msg.embeds) > 0
-                    and msg.embeds[0].title in ["Message Received", "Message Sent"]
-                ):
-                    guild = msg.embeds[0].footer.text.split()[-1]
-                    guild = await self.bot.get_guild(int(guild))
-                    break
+            guild_id = await tools.get_last_guild(self.bot, message.author.id)
+
+            if guild_id is None:
+                async for msg in message.channel.history(limit=30):
+                    if (
+                        msg.author.id == self.bot.id
+                        and len(msg.embeds) > 0
+                        and msg.embeds[0].title in ["Message Received", "Message Sent"]
+                    ):
+                        guild_id = int(msg.embeds[0].footer.text.split()[-1])
+                        await tools.set_last_guild(self.bot, message.author.id, guild_id)
+                        break
+
+            if guild_id is not None:
+                guild = await self.bot.get_guild(guild_id)
 
             settings = await tools.get_user_settings(self.bot, message.author.id)
             if settings is None or settings[0] is True:
@@ -369,24 +367,14 @@ class DirectMessageEvents(commands.Cog, name="Direct Message"):
             )
             msg = await message.channel.send(embed)
 
-            await msg.add_reaction("✅")
-            await msg.add_reaction("🔁")
-            await msg.add_reaction("❌")
-
-            await self.bot.state.set(
-                f"reaction_menu:{msg.channel.id}:{msg.id}",
-                {
-                    "kind": "confirmation",
-                    "end": int(time.time()) + 180,
-                    "data": {
-                        "guild": guild.id,
-                        "msg": message._data,
-                    },
-                },
-            )
-            await self.bot.state.sadd(
-                "reaction_menu_keys",
-                f"reaction_menu:{msg.channel.id}:{msg.id}",
+            await tools.add_reactions(msg, ["✅", "🔁", "❌"])
+
+            await tools.set_reaction_menu(
+                self.bot,
+                msg.channel.id,
+                msg.id,
+                "confirmation",
+                {"guild": guild.id, "msg": tools.trim_message(message._data)},
             )
         elif guild:
             await self.send_mail(message, guild)
@@ -1,5 +1,6 @@
+import asyncio
 import logging
-import time
+import re
 
 import discord
 
@@ -11,6 +12,8 @@ from utils import tools
 
 log = logging.getLogger(__name__)
 
+_command_name = re.compile(r"\S+")
+
 
 class Events(commands.Cog):
     def __init__(self, bot):
@@ -48,11 +51,7 @@ class Events(commands.Cog):
                 except (discord.Forbidden, discord.NotFound):
                     pass
 
-            await self.bot.state.delete(f"reaction_menu:{channel.id}:{message.id}")
-            await self.bot.state.srem(
-                "reaction_menu_keys",
-                f"reaction_menu:{channel.id}:{message.id}",
-            )
+            await tools.remove_reaction_menu(self.bot, channel.id, message.id)
             return
 
         if payload.emoji.name in ["⏮️", "◀️", "⏹️", "▶️", "⏭️"]:
@@ -61,35 +60,26 @@ class Events(commands.Cog):
                 return
 
             if payload.emoji.name == "⏹️":
-                try:
-                    await message.clear_reactions()
-                except discord.Forbidden:
-                    for emoji in ["⏮️", "◀️", "⏹️", "▶️", "⏭️"]:
-                        try:
-                            await message.remove_reaction(emoji, self.bot.user)
-                        except discord.NotFound:
-                            pass
-
-                await self.bot.state.delete(f"reaction_menu:{channel.id}:{message.id}")
-                await self.bot.state.srem(
-                    "reaction_menu_keys",
-                    f"reaction_menu:{channel.id}:{message.id}",
+                await tools.remove_reactions(
+                    self.bot, message, ["⏮️", "◀️", "⏹️", "▶️", "⏭️"], clear=True
                 )
+
+                await tools.remove_reaction_menu(self.bot, channel.id, message.id)
                 return
 
-            page = menu["data"]["page"]
-            all_pages = menu["data"]["all_pages"]
+            page = menu["page"]
+            pages = menu["data"]["pages"]
 
             if payload.emoji.name == "⏮️":
                 page = 0
             elif payload.emoji.name == "◀️" and page > 0:
                 page -= 1
-            elif payload.emoji.name == "▶️" and page < len(all_pages) - 1:
+            elif payload.emoji.name == "▶️" and page < len(pages["pages"]) - 1:
                 page += 1
             elif payload.emoji.name == "⏭️":
-                page = len(all_pages) - 1
+                page = len(pages["pages"]) - 1
 
-            await message.edit(Embed.from_dict(all_pages[page]))
+            await message.edit(Embed.from_dict(tools.unpack_page(pages, page)))
 
             try:
                 member = tools.create_fake_user(payload.user_id)
@@ -97,15 +87,36 @@ class Events(commands.Cog):
             except (discord.Forbidden, discord.NotFound):
                 pass
 
-            menu["data"]["page"] = page
-            menu["end"] = int(time.time()) + 180
-            await self.bot.state.set(f"reaction_menu:{channel.id}:{message.id}", menu)
+            await tools.set_reaction_menu_page(self.bot, channel.id, message.id, page)
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.bot:
             return
 
+        handlers = [self.process_commands(message)]
+
+        if isinstance(message.channel, discord.DMChannel):
+            handlers.append(self.bot.cogs["Direct Message"].handle_message(message))
+        elif tools.is_modmail_channel(message.channel):
+            handlers.append(self.bot.cogs["ModMailEvents"].handle_message(message))
+
+        await asyncio.gather(*handlers)
+
+    async def is_command(self, message):
+        prefix = await tools.get_message_prefix(self.bot, message)
+
+        for prefix in [f"<@{self.bot.id}> ", f"<@!{self.bot.id}> ", prefix]:
+            if message.content.startswith(prefix):
+                name = _command_name.match(message.content, len(prefix))
+                return name is not None and name.group() in self.bot.all_commands
+
+        return False
+
+    async def process_commands(self, message):
+        if not await self.is_command(message):
+            return
+
         ctx = await self.bot.get_context(message, cls=Context)
         if not ctx.command:
             return
@@ -117,7 +128,7 @@ class Events(commands.Cog):
                 await message.guild.leave()
                 return
 
-            permissions = await message.channel.permissions_for(await ctx.guild.me())
+            permissions = await tools.get_message_permissions(self.bot, message)
 
             if permissions.send_messages is False:
                 return
@@ -128,12 +139,12 @@ class Events(commands.Cog):
                 )
                 return
 
-        if await tools.is_user_banned(self.bot, message.author):
+        if await tools.is_message_author_banned(self.bot, message):
             await ctx.send(ErrorEmbed("You are banned from the bot."))
             return
 
         if ctx.prefix in [f"<@{self.bot.id}> ", f"<@!{self.bot.id}> "]:
-            ctx.prefix = await tools.get_guild_prefix(self.bot, message.guild)
+            ctx.prefix = await tools.get_message_prefix(self.bot, message)
 
         await self.bot.invoke(ctx)
 
@@ -15,41 +15,45 @@ class ModMailEvents(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild or not tools.is_modmail_channel(message.channel):
-            return
-
-        permissions = await message.channel.permissions_for(await message.guild.me())
+    async def handle_message(self, message):
+        permissions = await tools.get_message_permissions(self.bot, message)
         if permissions.send_messages is False or permissions.embed_links is False:
             return
 
-        guild_prefix = await tools.get_guild_prefix(self.bot, message.guild)
+        guild_prefix = await tools.get_message_prefix(self.bot, message)
         for prefix in [f"<@{self.bot.id}> ", f"<@!{self.bot.id}> ", guild_prefix]:
             if message.content.startswith(prefix):
+                await self.add_comment(message)
                 return
 
-        data = await tools.get_data(self.bot, message.guild.id)
-        if data[11] is True:
+        data = await tools.get_message_data(self.bot, message)
+        if data.command_only is True:
+            await self.add_comment(message)
             return
 
-        if await tools.is_user_banned(self.bot, message.author):
+        if await tools.is_message_author_banned(self.bot, message):
             await message.channel.send(ErrorEmbed("You are banned from this bot."))
             return
 
-        if data[10] is True:
+        if data.anonymous is True:
             await self.send_mail_mod(message, prefix, anon=True)
             return
 
         await self.send_mail_mod(message, prefix)
 
+    async def add_comment(self, message):
+        if message.content and not await self.bot.cogs["Events"].is_command(message):
+            await tools.add_transcript(
+                self.bot, message, f"{message.author} (Comment)", message.content
+            )
+
     async def send_mail_mod(self, message, prefix, anon=False, snippet=False):
         self.bot.prom.tickets_message.inc({})
 
-        data = await tools.get_data(self.bot, message.guild.id)
+        data = await tools.get_message_data(self.bot, message)
         user = tools.get_modmail_user(message.channel)
 
-        if user.id in data[9]:
+        if user.id in data.blacklist:
             await message.channel.send(
                 ErrorEmbed(
                     "That user is blacklisted from sending a message here. You need to whitelist "
@@ -58,9 +62,8 @@ class ModMailEvents(commands.Cog):
             )
             return
 
-        try:
-            member = await message.guild.fetch_member(user.id)
-        except discord.NotFound:
+        member = await message.guild.find_member(user.id)
+        if member is None:
             await message.channel.send(
                 ErrorEmbed(
                     f"The user was not found. Use `{prefix}close [reason]` to close this channel."
@@ -107,10 +110,17 @@ class ModMailEvents(commands.Cog):
         ):
             embed.add_field(f"Attachment {count}", attachment, False)
 
-        for file in files:
-            file.reset()
+        tools.set_attachment_image(embed, dm_message.attachments)
 
-        await message.channel.send(embed, files=files)
+        ticket_message = await message.channel.send(embed)
+        await tools.add_transcript(
+            self.bot,
+            ticket_message,
+            f"{message.author} (Staff)",
+            message.content,
+            dm_message.attachments,
+        )
+        await tools.set_last_guild(self.bot, user.id, message.guild.id)
 
         try:
             await message.delete()
@@ -22,16 +22,13 @@ class Snippet(commands.Cog):
     @commands.guild_only()
     @commands.command(description="Use a snippet.", aliases=["s"], usage="snippet <name>")
     async def snippet(self, ctx, *, name: str):
-        async with self.bot.pool.acquire() as conn:
-            res = await conn.fetchrow(
-                "SELECT content FROM snippet WHERE name=$1 AND guild=$2", name.lower(), ctx.guild.id
-            )
+        content = await tools.get_snippet(self.bot, ctx.guild.id, name.lower())
 
-        if not res:
+        if content is None:
             await ctx.send(ErrorEmbed("The snippet was not found."))
             return
 
-        ctx.message.content = res[0]
+        ctx.message.content = content
         await self.bot.cogs["ModMailEvents"].send_mail_mod(
             ctx.message, ctx.prefix, anon=False, snippet=True
         )
@@ -45,16 +42,13 @@ class Snippet(commands.Cog):
         description="Use a snippet anonymously.", aliases=["as"], usage="asnippet <name>"
     )
     async def asnippet(self, ctx, *, name: str):
-        async with self.bot.pool.acquire() as conn:
-            res = await conn.fetchrow(
-                "SELECT content FROM snippet WHERE name=$1 AND guild=$2", name.lower(), ctx.guild.id
-            )
+        content = await tools.get_snippet(self.bot, ctx.guild.id, name.lower())
 
-        if not res:
+        if content is None:
             await ctx.send(ErrorEmbed("The snippet was not found."))
             return
 
-        ctx.message.content = res[0]
+        ctx.message.content = content
         await self.bot.cogs["ModMailEvents"].send_mail_mod(
             ctx.message, ctx.prefix, anon=True, snippet=True
         )
@@ -90,6 +84,8 @@ class Snippet(commands.Cog):
                 await ctx.send(ErrorEmbed("A snippet with that name already exists."))
                 return
 
+        await tools.invalidate_cache(self.bot, "snippet", ctx.guild.id)
+
         await ctx.send(Embed("The snippet was added successfully."))
 
     @checks.in_database()
@@ -107,6 +103,8 @@ class Snippet(commands.Cog):
             await ctx.send(ErrorEmbed("A snippet with that name was not found."))
             return
 
+        await tools.invalidate_cache(self.bot, "snippet", ctx.guild.id)
+
         await ctx.send(Embed("The snippet was removed successfully."))
 
     @checks.in_database()
@@ -118,6 +116,8 @@ class Snippet(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             await conn.execute("DELETE FROM snippet WHERE guild=$1", ctx.guild.id)
 
+        await tools.invalidate_cache(self.bot, "snippet", ctx.guild.id)
+
         await ctx.send(Embed("All snippets were removed successfully."))
 
     @checks.in_database()
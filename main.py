@@ -96,113 +96,156 @@ class Scheduler:
 
     async def premium_updater(self):
         while True:
-            async with self.bot.pool.acquire() as conn:
-                premium = await conn.fetch(
-                    "SELECT identifier, guild FROM premium WHERE expiry IS NOT NULL AND expiry<$1",
-                    int(datetime.utcnow().timestamp() * 1000),
-                )
+            now = int(datetime.utcnow().timestamp() * 1000)
 
-                for row in premium:
-                    for guild in row[1]:
+            async with self.bot.pool.acquire() as conn:
+                async with conn.transaction():
+                    guilds = await conn.fetch(
+                        "WITH expired AS (DELETE FROM premium WHERE expiry IS NOT NULL AND "
+                        "expiry<$1 RETURNING guild) SELECT DISTINCT unnest(guild) FROM expired",
+                        now,
+                    )
+                    guilds = [x[0] for x in guilds]
+
+                    if guilds:
                         await conn.execute(
                             "UPDATE data SET welcome=$1, goodbye=$2, loggingplus=$3, aiprompt=$4 "
-                            "WHERE guild=$5",
+                            "WHERE guild=ANY($5)",
                             None,
                             None,
                             0,
                             None,
-                            guild,
+                            guilds,
                         )
-                        await conn.execute("DELETE FROM snippet WHERE guild=$1", guild)
+                        await conn.execute("DELETE FROM snippet WHERE guild=ANY($1)", guilds)
+
+                expiry = await conn.fetchval(
+                    "SELECT min(expiry) FROM premium WHERE expiry IS NOT NULL"
+                )
+
+            for guild in guilds:
+                await tools.invalidate_data(self.bot, guild)
+                await tools.invalidate_cache(self.bot, "snippet", guild)
 
-                    await conn.execute("DELETE FROM premium WHERE identifier=$1", row[0])
+            delay = 300 if expiry is None else (expiry - now) / 1000
+            await asyncio.sleep(min(max(delay, 1), 300))
+
+    def stats_targets(self, guilds, shards):
+        return {
+            "topgg": (
+                f"https://top.gg/api/bots/{self.bot.id}/stats",
+                config.TOPGG_TOKEN,
+                {"server_count": guilds, "shard_count": shards},
+            ),
+            "dbots": (
+                f"https://discord.bots.gg/api/v1/bots/{self.bot.id}/stats",
+                config.DBOTS_TOKEN,
+                {"guildCount": guilds, "shardCount": shards},
+            ),
+            "dbl": (
+                f"https://discordbotlist.com/api/v1/bots/{self.bot.id}/stats",
+                config.DBL_TOKEN,
+                {"guilds": guilds},
+            ),
+            "bod": (
+                f"https://bots.ondiscord.xyz/bot-api/bots/{self.bot.id}/guilds",
+                config.BOD_TOKEN,
+                {"guildCount": guilds},
+            ),
+        }
 
-            await asyncio.sleep(60)
+    async def post_stats(self, target, url, token, data, retries=3, timeout=10):
+        for attempt in range(retries):
+            start = time.perf_counter()
+
+            try:
+                async with self.session.post(
+                    url,
+                    data=orjson.dumps(data),
+                    headers={"Authorization": token, "Content-Type": "application/json"},
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                ) as response:
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = None
+
+            self.bot.prom.stats_latency.set({"target": target}, time.perf_counter() - start)
+            self.bot.prom.stats_posts.inc({"target": target, "status": str(status or "error")})
+
+            if status is not None and status < 500 and status != 429:
+                return
+
+            if attempt < retries - 1:
+                await asyncio.sleep(5 * 2**attempt)
+
+        print(f"[Cluster Manager] Failed to post stats to {target}.")
 
     async def bot_stats_updater(self):
         while True:
             guilds = await self.bot.state.scard("guild_keys")
             shards = await self.bot.shard_count()
 
-            await self.session.post(
-                f"https://top.gg/api/bots/{self.bot.id}/stats",
-                data=orjson.dumps({"server_count": guilds, "shard_count": shards}),
-                headers={"Authorization": config.TOPGG_TOKEN, "Content-Type": "application/json"},
+            await asyncio.gather(
+                *[
+                    self.post_stats(target, *value)
+                    for target, value in self.stats_targets(guilds, shards).items()
+                ]
             )
 
-            await self.session.post(
-                f"https://discord.bots.gg/api/v1/bots/{self.bot.id}/stats",
-                data=orjson.dumps({"guildCount": guilds, "shardCount": shards}),
-                headers={"Authorization": config.DBOTS_TOKEN, "Content-Type": "application/json"},
-            )
+            await asyncio.sleep(900)
 
-            await self.session.post(
-                f"https://discordbotlist.com/api/v1/bots/{self.bot.id}/stats",
-                data=orjson.dumps({"guilds": guilds}),
-                headers={"Authorization": config.DBL_TOKEN, "Content-Type": "application/json"},
-            )
+    async def expire_menu(self, menu_key):
+        if not await self.bot.state.zrem("reaction_menus", menu_key):
+            return
 
-            await self.session.post(
-                f"https://bots.ondiscord.xyz/bot-api/bots/{self.bot.id}/guilds",
-                data=orjson.dumps({"guildCount": guilds}),
-                headers={"Authorization": config.BOD_TOKEN, "Content-Type": "application/json"},
-            )
+        kind = await self.bot.state.hget(menu_key, "kind", decode=False)
+        if kind is None:
+            return
 
-            await asyncio.sleep(900)
+        channel = tools.create_fake_channel(self.bot, menu_key.split(":")[1])
+        message = tools.create_fake_message(self.bot, channel, menu_key.split(":")[2])
 
-    async def cleanup(self):
-        while True:
-            for menu_key in await self.bot.state.smembers("reaction_menu_keys"):
-                menu = await self.bot.state.get(menu_key)
+        emojis = []
 
-                if menu is None:
-                    await self.bot.state.srem("reaction_menu_keys", menu_key)
-                    continue
+        if kind == "paginator":
+            emojis = ["⏮️", "◀️", "⏹️", "▶️", "⏭️"]
+        elif kind == "confirmation":
+            emojis = ["✅", "🔁", "❌"]
+            try:
+                await message.edit(ErrorEmbed("Time out. You did not choose anything."))
+            except discord.HTTPException:
+                emojis = []
+        elif kind == "selection":
+            emojis = ["1⃣", "2⃣", "3⃣", "4⃣", "5⃣", "6⃣", "7⃣", "8⃣", "9⃣", "🔟", "◀️", "▶️"]
+            try:
+                await message.edit(ErrorEmbed("Time out. You did not choose anything."))
+            except discord.HTTPException:
+                emojis = []
+        elif kind == "aireply":
+            emojis = ["✅", "❌"]
+            try:
+                await message.edit(ErrorEmbed("Time out. You did not choose anything."))
+            except discord.HTTPException:
+                emojis = []
+
+        await self.bot.state.delete(menu_key)
+        await tools.remove_reactions(
+            self.bot, message, emojis, clear=kind in ["paginator", "aireply"]
+        )
 
-                if menu["end"] > int(time.time()):
-                    continue
+    async def cleanup(self):
+        for menu_key in await self.bot.state.smembers("reaction_menu_keys"):
+            await self.bot.state.delete(menu_key)
 
-                channel = tools.create_fake_channel(self.bot, menu_key.split(":")[1])
-                message = tools.create_fake_message(self.bot, channel, menu_key.split(":")[2])
+        await self.bot.state.delete("reaction_menu_keys")
 
-                emojis = []
+        while True:
+            menu_keys = await self.bot.state.zrangebyscore(
+                "reaction_menus", maximum=int(time.time())
+            )
+            await asyncio.gather(*[self.expire_menu(x) for x in menu_keys])
 
-                if menu["kind"] == "paginator":
-                    try:
-                        await message.clear_reactions()
-                    except discord.Forbidden:
-                        emojis = ["⏮️", "◀️", "⏹️", "▶️", "⏭️"]
-                    except discord.HTTPException:
-                        pass
-                elif menu["kind"] == "confirmation":
-                    emojis = ["✅", "🔁", "❌"]
-                    try:
-                        await message.edit(ErrorEmbed("Time out. You did not choose anything."))
-                    except discord.HTTPException:
-                        emojis = []
-                elif menu["kind"] == "selection":
-                    emojis = ["1⃣", "2⃣", "3⃣", "4⃣", "5⃣", "6⃣", "7⃣", "8⃣", "9⃣", "🔟", "◀️", "▶️"]
-                    try:
-                        await message.edit(ErrorEmbed("Time out. You did not choose anything."))
-                    except discord.HTTPException:
-                        emojis = []
-                elif menu["kind"] == "aireply":
-                    emojis = ["✅", "❌"]
-                    try:
-                        await message.edit(ErrorEmbed("Time out. You did not choose anything."))
-                    except discord.HTTPException:
-                        emojis = []
-
-                await self.bot.state.delete(menu_key)
-                await self.bot.state.srem("reaction_menu_keys", menu_key)
-
-                for emoji in emojis:
-                    try:
-                        await message.remove_reaction(emoji, self.bot.user)
-                    except discord.HTTPException:
-                        pass
-
-            await asyncio.sleep(30)
+            await asyncio.sleep(5)
 
     async def launch(self):
         async with self.bot.pool.acquire() as conn:
@@ -0,0 +1 @@
+DROP INDEX premium_expiry_idx;
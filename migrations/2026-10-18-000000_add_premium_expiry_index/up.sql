@@ -0,0 +1 @@
+CREATE INDEX premium_expiry_idx ON premium (expiry) WHERE expiry IS NOT NULL;
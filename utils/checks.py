@@ -34,10 +34,8 @@ def is_admin():
 
 def in_database():
     async def predicate(ctx):
-        async with ctx.bot.pool.acquire() as conn:
-            res = await conn.fetchrow("SELECT category FROM data WHERE guild=$1", ctx.guild.id)
-
-        if not res or not res[0]:
+        data = await tools.get_data(ctx.bot, ctx.guild.id, create=False)
+        if not data or not data.category:
             await ctx.send(
                 ErrorEmbed(f"Your server has not been set up yet. Use `{ctx.prefix}setup` first.")
             )
@@ -115,7 +113,7 @@ def is_mod():
         if (await ctx.message.member.guild_permissions()).administrator:
             return True
 
-        for role in (await tools.get_data(ctx.bot, ctx.guild.id))[3]:
+        for role in (await tools.get_message_data(ctx.bot, ctx.message)).access_roles:
             if role in ctx.message.member._roles:
                 return True
 
@@ -143,7 +141,7 @@ def bot_has_permissions(**perms):
         if not isinstance(ctx.channel, TextChannel):
             return True
 
-        permissions = await ctx.channel.permissions_for(await ctx.guild.me())
+        permissions = await tools.get_message_permissions(ctx.bot, ctx.message)
         missing = [perm for perm, value in perms.items() if getattr(permissions, perm) != value]
 
         if not missing:
@@ -72,10 +72,9 @@ class MemberConverter(commands.MemberConverter):
     async def convert(self, ctx, argument):
         match = self._get_id_match(argument) or re.match(r"<@!?([0-9]+)>$", argument)
         if match:
-            try:
-                return await ctx.guild.fetch_member(int(match.group(1)))
-            except discord.NotFound:
-                pass
+            member = await ctx.guild.find_member(int(match.group(1)))
+            if member:
+                return member
 
         members = await ctx.bot.http.request_guild_members(ctx.guild.id, argument)
         if len(members) > 0:
@@ -112,6 +111,10 @@ class PingRoleConverter(RoleConverter):
 
 class UserConverter(commands.UserConverter):
     async def convert(self, ctx, argument):
+        if not getattr(ctx, "_users_fetched", False):
+            ctx._users_fetched = True
+            await ctx.bot.fetch_users(re.findall(r"\b[0-9]{15,20}\b", ctx.message.content))
+
         match = self._get_id_match(argument) or re.match(r"<@!?([0-9]+)>$", argument)
         if match:
             try:
@@ -4,7 +4,7 @@ import os
 import platform
 import resource
 
-from aioprometheus import Counter, Gauge
+from aioprometheus import Counter, Gauge, Histogram
 from aioprometheus.service import Service
 
 
@@ -39,10 +39,23 @@ class Prometheus:
         self.collections = Counter("python_gc_collections", "Number of times collected by GC.")
 
         self.http = Counter("modmail_http_requests", "Number of http requests sent.")
+        self.http_latency = Histogram(
+            "modmail_http_request_duration_seconds",
+            "Latency of http requests sent.",
+            buckets=[0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+        )
         self.commands = Counter("modmail_commands", "Number of commands used.")
         self.tickets = Counter("modmail_tickets", "Number of tickets created.")
         self.tickets_message = Counter("modmail_tickets_message", "Number of ticket messages sent.")
 
+        self.stats_posts = Counter("modmail_stats_posts", "Number of bot list stats posts.")
+        self.stats_latency = Gauge("modmail_stats_latency_seconds", "Latency of stats posts.")
+
+        self.cache_hits = Counter("modmail_cache_hits", "Number of in-process cache hits.")
+        self.cache_misses = Counter("modmail_cache_misses", "Number of in-process cache misses.")
+        self.cache_evictions = Counter("modmail_cache_evictions", "Number of cache evictions.")
+        self.cache_size = Gauge("modmail_cache_size", "Number of entries in the cache.")
+
     async def start(self):
         await self.msvr.start(addr="127.0.0.1", port=6100 + self.bot.cluster)
         self.msvr._runner._server._kwargs["access_log"] = None
@@ -51,6 +64,8 @@ class Prometheus:
             self.bot.loop.create_task(self.update_process_stats())
             self.bot.loop.create_task(self.update_platform_stats())
 
+        self.bot.loop.create_task(self.update_cache_stats())
+
     async def update_process_stats(self):
         while True:
             with open(os.path.join(self.pid, "stat"), "rb") as stat:
@@ -83,3 +98,16 @@ class Prometheus:
                 self.collections.set({"generation": str(gen)}, stat["collections"])
 
             await asyncio.sleep(5)
+
+    async def update_cache_stats(self):
+        while True:
+            state = getattr(self.bot, "_connection", None)
+
+            if state is not None:
+                for name, cache in state.caches.items():
+                    self.cache_hits.set({"cache": name}, cache.hits)
+                    self.cache_misses.set({"cache": name}, cache.misses)
+                    self.cache_evictions.set({"cache": name}, cache.evictions)
+                    self.cache_size.set({"cache": name}, len(cache))
+
+            await asyncio.sleep(5)
@@ -1,7 +1,10 @@
+import asyncio
 import logging
 import time
+import zlib
 
 import discord
+import orjson
 
 from discord.http import Route
 from discord.user import User
@@ -10,6 +13,7 @@ from classes.channel import DMChannel
 from classes.embed import Embed, ErrorEmbed
 from classes.http import HTTPClient
 from classes.message import Message
+from classes.misc import GuildData
 
 log = logging.getLogger(__name__)
 
@@ -30,7 +34,7 @@ def create_fake_channel(bot, channel_id):
     return DMChannel(me=bot.user, state=bot.state, data={"id": channel_id})
 
 
-def create_fake_message(bot, channel, message_id):
+def create_fake_message(bot, channel, message_id, data=None):
     return Message(
         state=bot.state,
         channel=channel,
@@ -45,10 +49,49 @@ def create_fake_message(bot, channel, message_id):
             "mention_everyone": False,
             "tts": False,
             "content": "",
+            **(data or {}),
         },
     )
 
 
+def trim_message(data):
+    keys = ["id", "channel_id", "author", "content", "attachments"]
+    return {x: data[x] for x in keys if x in data}
+
+
+def pack_pages(pages):
+    pages = [x.to_dict() for x in pages]
+    base = {
+        x: y for x, y in pages[0].items() if x != "fields" and all(z.get(x) == y for z in pages)
+    }
+
+    fields = []
+    indexes = {}
+    packed = []
+
+    for page in pages:
+        item = {x: y for x, y in page.items() if x != "fields" and x not in base}
+        item["fields"] = []
+
+        for field in page.get("fields", []):
+            key = orjson.dumps(field)
+            if key not in indexes:
+                indexes[key] = len(fields)
+                fields.append(field)
+
+            item["fields"].append(indexes[key])
+
+        packed.append(item)
+
+    return {"base": base, "fields": fields, "pages": packed}
+
+
+def unpack_page(packed, index):
+    page = {**packed["base"], **packed["pages"][index]}
+    page["fields"] = [packed["fields"][x] for x in page["fields"]]
+    return page
+
+
 async def create_paginator(bot, ctx, pages):
     if len(pages) == 1:
         embed = pages[0]
@@ -57,22 +100,9 @@ async def create_paginator(bot, ctx, pages):
         return
 
     msg = await ctx.send(pages[0])
+    await add_reactions(msg, ["⏮️", "◀️", "⏹️", "▶️", "⏭️"])
 
-    for reaction in ["⏮️", "◀️", "⏹️", "▶️", "⏭️"]:
-        await msg.add_reaction(reaction)
-
-    await bot.state.set(
-        f"reaction_menu:{msg.channel.id}:{msg.id}",
-        {
-            "kind": "paginator",
-            "end": int(time.time()) + 180,
-            "data": {
-                "page": 0,
-                "all_pages": [page.to_dict() for page in pages],
-            },
-        },
-    )
-    await bot.state.sadd("reaction_menu_keys", f"reaction_menu:{msg.channel.id}:{msg.id}")
+    await set_reaction_menu(bot, msg.channel.id, msg.id, "paginator", {"pages": pack_pages(pages)})
 
 
 async def select_guild(bot, message, msg):
@@ -102,10 +132,7 @@ async def select_guild(bot, message, msg):
         if guild is None:
             continue
 
-        channel = None
-        for text_channel in await guild.text_channels():
-            if is_modmail_channel(text_channel, message.author.id):
-                channel = text_channel
+        channel = await get_ticket_channel(bot, guild, message.author.id)
 
         if not channel:
             guilds[str(guild.id)] = (guild.name, False)
@@ -139,45 +166,82 @@ async def select_guild(bot, message, msg):
 
     await msg.edit(embeds[0])
 
-    if len(guilds) > 10:
-        await msg.add_reaction("◀️")
-        await msg.add_reaction("▶️")
-
     emojis = ["1⃣", "2⃣", "3⃣", "4⃣", "5⃣", "6⃣", "7⃣", "8⃣", "9⃣", "🔟"]
 
-    for reaction in emojis[: len(embeds[0].fields)]:
-        await msg.add_reaction(reaction)
+    await add_reactions(
+        msg, (["◀️", "▶️"] if len(guilds) > 10 else []) + emojis[: len(embeds[0].fields)]
+    )
 
-    await bot.state.set(
-        f"reaction_menu:{msg.channel.id}:{msg.id}",
-        {
-            "kind": "selection",
-            "end": int(time.time()) + 180,
-            "data": {
-                "msg": message._data,
-                "page": 0,
-                "all_pages": [embed.to_dict() for embed in embeds],
-            },
-        },
+    await set_reaction_menu(
+        bot,
+        msg.channel.id,
+        msg.id,
+        "selection",
+        {"msg": trim_message(message._data), "pages": pack_pages(embeds)},
     )
-    await bot.state.sadd("reaction_menu_keys", f"reaction_menu:{msg.channel.id}:{msg.id}")
+
+
+async def add_reactions(message, emojis):
+    for emoji in emojis:
+        await message.add_reaction(emoji)
+
+
+async def remove_reactions(bot, message, emojis, clear=False):
+    if clear:
+        try:
+            return await message.clear_reactions()
+        except discord.Forbidden:
+            pass
+        except discord.HTTPException:
+            return
+
+    async def remove(emoji):
+        try:
+            await message.remove_reaction(emoji, bot.user)
+        except discord.HTTPException:
+            pass
+
+    await asyncio.gather(*[remove(x) for x in emojis])
+
+
+async def set_reaction_menu(bot, channel_id, message_id, kind, data):
+    key = f"reaction_menu:{channel_id}:{message_id}"
+    await bot.state.hset(key, {"kind": kind, "page": 0, "data": zlib.compress(orjson.dumps(data))})
+    await bot.state.zadd("reaction_menus", int(time.time()) + 180, key)
+
+
+async def set_reaction_menu_page(bot, channel_id, message_id, page):
+    key = f"reaction_menu:{channel_id}:{message_id}"
+    await bot.state.hset(key, {"page": page})
+    await bot.state.zadd("reaction_menus", int(time.time()) + 180, key)
+
+
+async def remove_reaction_menu(bot, channel_id, message_id):
+    await bot.state.delete(f"reaction_menu:{channel_id}:{message_id}")
+    await bot.state.zrem("reaction_menus", f"reaction_menu:{channel_id}:{message_id}")
 
 
 async def get_reaction_menu(bot, payload, kind):
-    menu = await bot.state.get(f"reaction_menu:{payload.channel_id}:{payload.message_id}")
-    if menu and menu["kind"] == kind:
+    menu = await bot.state.hgetall(f"reaction_menu:{payload.channel_id}:{payload.message_id}")
+    if menu.get("kind") == kind.encode():
         channel = create_fake_channel(bot, payload.channel_id)
         message = create_fake_message(bot, channel, payload.message_id)
 
+        menu = {
+            "kind": kind,
+            "page": int(menu["page"]),
+            "data": orjson.loads(zlib.decompress(menu["data"])),
+        }
+
         return menu, channel, message
 
     return None, None, None
 
 
-async def get_data(bot, guild):
+async def _fetch_data(bot, guild, create=True):
     async with bot.pool.acquire() as conn:
         res = await conn.fetchrow("SELECT * FROM data WHERE guild=$1", guild)
-        if res:
+        if res or not create:
             return res
 
         return await conn.fetchrow(
@@ -200,14 +264,52 @@ async def get_data(bot, guild):
         )
 
 
-async def get_guild_prefix(bot, guild):
-    if not guild:
-        return bot.config.DEFAULT_PREFIX
+async def get_data(bot, guild, create=True):
+    data = bot.state.caches["data"].get(guild)
+    if data is not None:
+        return data
+
+    res = await bot.state.get(f"guild_data:{guild}")
+    if res is None:
+        res = await _fetch_data(bot, guild, create)
+        if res is None:
+            return None
+
+        res = dict(res)
+        await bot.state.set(f"guild_data:{guild}", res, expire=3600)
+
+    data = GuildData(res)
+    bot.state.caches["data"].set(guild, data)
+
+    return data
+
+
+async def invalidate_data(bot, guild):
+    await bot.state.delete(f"guild_data:{guild}")
+    await invalidate_cache(bot, "data", guild)
+
+
+async def invalidate_cache(bot, kind, guild):
+    bot.state.caches[kind].delete(guild)
+    await bot.state.publish("cache_invalidation", {"type": kind, "guild": guild})
 
+
+async def get_snippet(bot, guild, name):
+    snippets = bot.state.caches["snippet"].get(guild)
+
+    if snippets is None:
+        async with bot.pool.acquire() as conn:
+            res = await conn.fetch("SELECT name, content FROM snippet WHERE guild=$1", guild)
+
+        snippets = {x[0]: x[1] for x in res}
+        bot.state.caches["snippet"].set(guild, snippets)
+
+    return snippets.get(name)
+
+
+async def _fetch_guild_prefix(bot, guild):
     prefix = await bot.state.get(f"prefix:{guild.id}", False)
-    if prefix == "":
-        return bot.config.DEFAULT_PREFIX
-    elif prefix is not None:
+    if prefix is not None:
         return prefix
 
     async with bot.pool.acquire() as conn:
@@ -218,7 +320,66 @@ async def get_guild_prefix(bot, guild):
         return res[0]
 
     await bot.state.set(f"prefix:{guild.id}", "")
-    return bot.config.DEFAULT_PREFIX
+    return ""
+
+
+async def get_guild_prefix(bot, guild):
+    if not guild:
+        return bot.config.DEFAULT_PREFIX
+
+    prefix = bot.state.caches["prefix"].get(guild.id)
+    if prefix is None:
+        prefix = await _fetch_guild_prefix(bot, guild)
+        bot.state.caches["prefix"].set(guild.id, prefix)
+
+    return prefix or bot.config.DEFAULT_PREFIX
+
+
+def _memoize(message, key, factory):
+    try:
+        memo = message._memo
+    except AttributeError:
+        memo = message._memo = {}
+
+    if key not in memo:
+        memo[key] = asyncio.ensure_future(factory())
+
+    return memo[key]
+
+
+async def get_message_prefix(bot, message):
+    guild_id = message.guild.id if message.guild else None
+    return await _memoize(
+        message, ("prefix", guild_id), lambda: get_guild_prefix(bot, message.guild)
+    )
+
+
+async def get_message_data(bot, message):
+    return await _memoize(
+        message, ("data", message.guild.id), lambda: get_data(bot, message.guild.id)
+    )
+
+
+async def get_message_permissions(bot, message):
+    async def factory():
+        return await message.channel.permissions_for(await message.guild.me())
+
+    return await _memoize(message, ("permissions", message.channel.id), factory)
+
+
+async def is_message_author_banned(bot, message):
+    return await _memoize(
+        message, ("banned", message.author.id), lambda: is_user_banned(bot, message.author)
+    )
+
+
+async def get_last_guild(bot, user):
+    return await bot.state.get(f"last_guild:{user}")
+
+
+async def set_last_guild(bot, user, guild):
+    await bot.state.set(f"last_guild:{user}", guild)
+    await bot.state.expire(f"last_guild:{user}", 2592000)
 
 
 async def get_user_settings(bot, user):
@@ -291,7 +452,11 @@ async def get_premium_slots(bot, user):
 
     guild = await bot.get_guild(int(bot.config.MAIN_SERVER))
     if guild:
-        member = await guild.fetch_member(user)
+        try:
+            member = await guild.fetch_member(user)
+        except discord.NotFound:
+            member = None
+
         if member:
             if int(bot.config.PREMIUM5_ROLE) in member._roles:
                 return 5
@@ -321,6 +486,9 @@ async def remove_premium(bot, guild):
         )
         await conn.execute("DELETE FROM snippet WHERE guild=$1", guild)
 
+    await invalidate_data(bot, guild)
+    await invalidate_cache(bot, "snippet", guild)
+
 
 async def is_user_banned(bot, user):
     return await bot.state.sismember("banned_users", user.id)
@@ -330,11 +498,94 @@ async def is_guild_banned(bot, guild):
     return await bot.state.sismember("banned_guilds", guild.id)
 
 
-def is_modmail_channel(channel, user_id=None):
-    if not getattr(channel, "topic", None) or not channel.topic.startswith("ModMail Channel "):
+async def index_tickets(bot, guild):
+    channels = [x for x in await guild.text_channels() if is_modmail_channel(x)]
+
+    if len(channels) >= 1:
+        await bot.state.set(
+            [y for x in channels for y in (f"ticket:{guild.id}:{get_modmail_user(x).id}", x.id)]
+        )
+
+    await bot.state.set(f"ticket_index:{guild.id}", 1)
+    await bot.state.expire(f"ticket_index:{guild.id}", 86400)
+
+
+async def get_ticket_channel(bot, guild, user_id):
+    channel_id = await bot.state.get(f"ticket:{guild.id}:{user_id}")
+
+    if channel_id is None and await bot.state.get(f"ticket_index:{guild.id}") is None:
+        await index_tickets(bot, guild)
+        channel_id = await bot.state.get(f"ticket:{guild.id}:{user_id}")
+
+    if channel_id is None:
+        return None
+
+    channel = await guild.get_channel(channel_id)
+    if is_modmail_channel(channel, user_id):
+        return channel
+
+    await bot.state.delete(f"ticket:{guild.id}:{user_id}")
+    return None
+
+
+async def add_ticket(bot, channel):
+    if is_modmail_channel(channel):
+        await bot.state.set(f"ticket:{channel.guild.id}:{get_modmail_user(channel).id}", channel.id)
+
+
+async def remove_ticket(bot, channel):
+    if not is_modmail_channel(channel):
+        return
+
+    key = f"ticket:{channel.guild.id}:{get_modmail_user(channel).id}"
+    if await bot.state.get(key) == channel.id:
+        await bot.state.delete(key)
+
+
+async def start_transcript(bot, channel):
+    await bot.state.delete(f"transcript:{channel.id}")
+    await bot.state.rpush(f"transcript:{channel.id}", None)
+    await bot.state.expire(f"transcript:{channel.id}", 2592000)
+
+
+async def add_transcript(bot, message, author, content, attachments=None):
+    description = content
+
+    for attachment in attachments or []:
+        if not description:
+            description = f"(Attachment: {attachment.url})"
+        else:
+            description += f" (Attachment: {attachment.url})"
+
+    await bot.state.rpushx(
+        f"transcript:{message.channel.id}",
+        {
+            "time": str(message.created_at.replace(microsecond=0)),
+            "author": author,
+            "description": description,
+        },
+        maxlen=10000,
+        expire=2592000,
+    )
+
+
+async def get_transcript(bot, channel):
+    entries = await bot.state.lrange(f"transcript:{channel.id}")
+    if not entries:
+        return None
+
+    return [f"[{x['time']}] {x['author']}: {x['description']}" for x in entries if x is not None]
+
+
+async def remove_transcript(bot, channel):
+    await bot.state.delete(f"transcript:{channel.id}")
+
+
+def is_modmail_topic(topic, user_id=None):
+    if not topic or not topic.startswith("ModMail Channel "):
         return False
 
-    parts = channel.topic.replace("ModMail Channel ", "").split(" ")
+    parts = topic.replace("ModMail Channel ", "").split(" ")
     if len(parts) < 2 or not parts[0].isdigit() or not parts[1].isdigit():
         return False
 
@@ -344,6 +595,10 @@ def is_modmail_channel(channel, user_id=None):
     return True
 
 
+def is_modmail_channel(channel, user_id=None):
+    return is_modmail_topic(getattr(channel, "topic", None), user_id)
+
+
 def get_modmail_user(channel):
     return create_fake_user(channel.topic.replace("ModMail Channel ", "").split(" ")[0])
 
@@ -352,6 +607,13 @@ def get_modmail_channel(bot, channel):
     return create_fake_channel(bot, channel.topic.replace("ModMail Channel ", "").split(" ")[1])
 
 
+def set_attachment_image(embed, attachments):
+    for attachment in attachments:
+        if attachment.filename.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp")):
+            embed.set_image(url=attachment.url)
+            return
+
+
 def perm_format(perm):
     return perm.replace("_", " ").replace("guild", "server").title()
 
@@ -24,7 +24,7 @@ log = logging.getLogger(__name__)
 
 
 async def command_prefix(bot2, message):
-    prefix = await tools.get_guild_prefix(bot2, message.guild)
+    prefix = await tools.get_message_prefix(bot2, message)
     return [f"<@{bot.id}> ", f"<@!{bot.id}> ", prefix]
 
 